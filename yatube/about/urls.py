@@ -1,10 +1,13 @@
 from django.urls import path
 from about import views
+from core.page_cache import cache_anonymous, static_page
 
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech'),
+    path('author/', cache_anonymous(static_page)(
+        views.AboutAuthorView.as_view()), name='author'),
+    path('tech/', cache_anonymous(static_page)(
+        views.AboutTechView.as_view()), name='tech'),
 ]
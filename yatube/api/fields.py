@@ -0,0 +1,85 @@
+"""Поля ресурсов API.
+
+Строки читаются через values_list() и сразу собираются в словари:
+ни моделей, ни сериализатора на каждое поле.
+"""
+from django.core.files.storage import default_storage
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Fields:
+    """Поля ресурса: имя в ответе → колонка для values_list().
+
+    converters — функции для значений, которые нельзя отдать как есть.
+    """
+
+    def __init__(self, columns, converters=None):
+        self.columns = columns
+        self.converters = converters or {}
+
+    def parse(self, raw):
+        """Имена из ?fields=a,b; пусто — все поля.
+
+        Неизвестное имя — ValueError с текстом для ответа 400.
+        """
+        if not raw:
+            return list(self.columns)
+        names = list(dict.fromkeys(
+            name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.columns]
+        if unknown or not names:
+            raise ValueError('Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(unknown), ', '.join(self.columns)))
+        return names
+
+    def rows(self, queryset, ids, names):
+        """Словари полей names для объектов ids в порядке ids."""
+        columns = [self.columns[name] for name in names]
+        found = {
+            row[0]: row[1:]
+            for row in queryset.filter(
+                pk__in=ids).values_list('pk', *columns)
+        }
+        converters = [
+            (index, self.converters[name])
+            for index, name in enumerate(names)
+            if name in self.converters
+        ]
+        result = []
+        for pk in ids:
+            values = found.get(pk)
+            if values is None:
+                continue
+            if converters:
+                values = list(values)
+                for index, convert in converters:
+                    values[index] = convert(values[index])
+            result.append(dict(zip(names, values)))
+        return result
+
+
+POST = Fields({
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}, {'image': media_url})
+GROUP = Fields({
+    'id': 'id',
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'stats__posts_count',
+})
+COMMENT = Fields({
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+})
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from api import views
+from core import object_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        object_cache.clear_local()
+        self.guest = Client()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, name, data=None, client=None, **kwargs):
+        response = (client or self.guest).get(
+            reverse(f'api:{name}', kwargs=kwargs), data)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+
+    def walk(self, name, limit, client=None, **kwargs):
+        """Все id ленты, пройденной по курсорам next."""
+        ids, cursor = [], None
+        while True:
+            data = {'limit': limit, 'fields': 'id'}
+            if cursor:
+                data['cursor'] = cursor
+            page = self.get(name, data, client, **kwargs).json()
+            ids += [row['id'] for row in page['results']]
+            cursor = page['next']
+            if cursor is None:
+                return ids
+
+    def test_feeds_walk_by_cursor(self):
+        newest_first = [post.id for post in reversed(self.posts)]
+        feeds = [
+            ('posts', {}, None),
+            ('group_posts', {'slug': self.group.slug}, None),
+            ('profile_posts', {'username': self.author.username}, None),
+            ('follow_posts', {}, self.client),
+        ]
+        for name, kwargs, client in feeds:
+            with self.subTest(feed=name):
+                self.assertEqual(
+                    self.walk(name, 2, client, **kwargs), newest_first)
+
+    def test_previous_cursor_returns_to_newer_page(self):
+        first = self.get('posts', {'limit': 2}).json()
+        second = self.get(
+            'posts', {'limit': 2, 'cursor': first['next']}).json()
+        back = self.get(
+            'posts', {'limit': 2, 'cursor': second['previous']}).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_post_fields(self):
+        row = self.get('post_detail', post_id=self.post.id).json()
+        self.assertEqual(
+            set(row), {'id', 'text', 'pub_date', 'author', 'group', 'image'})
+        self.assertEqual(row['author'], 'author')
+        self.assertEqual(row['group'], 'api')
+        self.assertEqual(row['text'], self.post.text)
+        self.assertIsNone(row['image'])
+
+    def test_sparse_fields(self):
+        row = self.get('post_detail', {'fields': 'text,author'},
+                       post_id=self.post.id).json()
+        self.assertEqual(row, {'text': self.post.text, 'author': 'author'})
+        response = self.get('posts', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_group_detail(self):
+        row = self.get('group_detail', slug=self.group.slug).json()
+        self.assertEqual(row['title'], 'Группа')
+        self.assertEqual(row['posts_count'], len(self.posts))
+
+    def test_comments(self):
+        page = self.get('comments', {'limit': 2}, post_id=self.post.id).json()
+        self.assertEqual(
+            [row['text'] for row in page['results']],
+            ['Комментарий 2', 'Комментарий 1'])
+        rest = self.get('comments', {'cursor': page['next']},
+                        post_id=self.post.id).json()
+        self.assertEqual(
+            [row['text'] for row in rest['results']], ['Комментарий 0'])
+        self.assertIsNone(rest['next'])
+
+    def test_errors(self):
+        cases = [
+            (self.get('post_detail', post_id=10 ** 6), 404),
+            (self.get('comments', post_id=10 ** 6), 404),
+            (self.get('group_detail', slug='missing'), 404),
+            (self.get('profile_posts', username='missing'), 404),
+            (self.get('follow_posts'), 401),
+            (self.get('posts', {'limit': 0}), 400),
+            (self.get('posts', {'limit': views.MAX_PAGE_SIZE + 1}), 400),
+            (self.get('posts', {'limit': 'много'}), 400),
+        ]
+        for response, status in cases:
+            with self.subTest(url=response.request['PATH_INFO']):
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_page_is_two_queries(self):
+        url = reverse('api:posts')
+        self.guest.get(url)
+        cache.clear()
+        object_cache.clear_local()
+        # Ключи страницы и её поля; поколения для ETag — в кэше.
+        with self.assertNumQueries(2):
+            self.guest.get(url, {'cursor': ''})
+
+    def test_etag(self):
+        url = reverse('api:posts')
+        etag = self.guest.get(url)['ETag']
+        self.assertEqual(
+            self.guest.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            self.guest.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,22 @@
+from django.urls import path
+
+from api import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='comments'),
+    path('groups/<slug>/', views.group_detail, name='group_detail'),
+    path('groups/<slug>/posts/', views.group_posts, name='group_posts'),
+    path(
+        'profile/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts'),
+    path('follow/', views.follow_posts, name='follow_posts'),
+    path('import/<str:kind>/', views.bulk_import, name='import'),
+]
@@ -0,0 +1,185 @@
+import base64
+import codecs
+
+from django.contrib.auth import authenticate
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+
+from api import fields
+from posts import ingest, lookups
+from posts.conditional import (comments_scopes, feed_condition,
+                               group_scopes, index_scopes, post_scopes,
+                               profile_scopes)
+from posts.models import Comment, Group, Post
+from posts.paginator import CursorPaginator, KeySource
+from posts.timeline import feed_key_source
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _error(message, status):
+    return _json({'detail': message}, status)
+
+
+def _page_size(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return PAGE_SIZE
+    size = int(raw)
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise ValueError
+    return size
+
+
+def _list(request, source, resource, queryset):
+    """Страница по ?cursor=: сначала ключи, затем поля одним запросом."""
+    try:
+        names = resource.parse(request.GET.get('fields'))
+    except ValueError as error:
+        return _error(str(error), 400)
+    try:
+        size = _page_size(request)
+    except ValueError:
+        return _error(f'limit — число от 1 до {MAX_PAGE_SIZE}.', 400)
+    paginator = CursorPaginator([], size, source)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return _json({
+        'results': resource.rows(
+            queryset, [key.pk for key in page], names),
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    })
+
+
+def _detail(request, resource, queryset, pk):
+    try:
+        names = resource.parse(request.GET.get('fields'))
+    except ValueError as error:
+        return _error(str(error), 400)
+    rows = resource.rows(queryset, [pk], names)
+    if not rows:
+        return _error('Не найдено.', 404)
+    return _json(rows[0])
+
+
+@require_safe
+@feed_condition(index_scopes)
+def posts(request):
+    return _list(request, KeySource(Post.objects.all()),
+                 fields.POST, Post.objects.all())
+
+
+@require_safe
+@feed_condition(post_scopes)
+def post_detail(request, post_id):
+    return _detail(request, fields.POST, Post.objects.all(), post_id)
+
+
+@require_safe
+@feed_condition(group_scopes)
+def group_detail(request, slug):
+    group = lookups.groups.get(slug)
+    if group is None:
+        return _error('Не найдено.', 404)
+    return _detail(request, fields.GROUP, Group.objects.all(), group.id)
+
+
+@require_safe
+@feed_condition(group_scopes)
+def group_posts(request, slug):
+    group = lookups.groups.get(slug)
+    if group is None:
+        return _error('Не найдено.', 404)
+    return _list(request, KeySource(Post.objects.filter(group_id=group.id)),
+                 fields.POST, Post.objects.all())
+
+
+@require_safe
+@feed_condition(profile_scopes)
+def profile_posts(request, username):
+    author = lookups.users.get(username)
+    if author is None:
+        return _error('Не найдено.', 404)
+    return _list(request, KeySource(Post.objects.filter(author_id=author.id)),
+                 fields.POST, Post.objects.all())
+
+
+@require_safe
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return _error('Нужно войти.', 401)
+    return _list(request, feed_key_source(request.user),
+                 fields.POST, Post.objects.all())
+
+
+@require_safe
+@feed_condition(comments_scopes)
+def post_comments(request, post_id):
+    if lookups.post_authors.get(post_id) is None:
+        return _error('Не найдено.', 404)
+    source = KeySource(
+        Comment.objects.filter(post_id=post_id), ('created', 'id'))
+    return _list(request, source, fields.COMMENT, Comment.objects.all())
+
+
+def _basic_user(request):
+    """Пользователь из заголовка Authorization: Basic или None."""
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'basic':
+        return None
+    try:
+        username, _, password = base64.b64decode(
+            credentials, validate=True).decode('utf-8').partition(':')
+    except ValueError:
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+def _import_result(importer):
+    return {
+        'created': importer.created,
+        'rejected': importer.error_count,
+        'errors': importer.errors,
+    }
+
+
+@csrf_exempt
+@require_POST
+def bulk_import(request, kind):
+    """Массовый импорт для сотрудников: тело — NDJSON или CSV.
+
+    Эндпоинт для скриптов переноса: вход — HTTP Basic в каждом запросе,
+    cookie сессии не принимаются, поэтому и CSRF-токен не нужен. Тело
+    читается построчно, без загрузки целиком в память.
+    """
+    user = _basic_user(request)
+    if user is None:
+        response = _error('Нужен заголовок Authorization: Basic.', 401)
+        response['WWW-Authenticate'] = 'Basic realm="yatube"'
+        return response
+    if not user.is_staff:
+        return _error('Только для сотрудников.', 403)
+    if kind not in ingest.IMPORTERS:
+        return _error('Не найдено.', 404)
+    format = request.GET.get('format')
+    if format is None:
+        format = 'csv' if request.content_type == 'text/csv' else 'ndjson'
+    if format not in ingest.FORMATS:
+        return _error('format — ndjson или csv.', 400)
+    importer = ingest.IMPORTERS[kind]()
+    try:
+        importer.run(ingest.read(
+            codecs.iterdecode(request, 'utf-8'), format))
+    except UnicodeDecodeError:
+        # Пачки до сбоя уже записаны: клиент должен знать, сколько.
+        return _json(dict(_import_result(importer),
+                          detail='Тело не в UTF-8.'), 400)
+    return _json(_import_result(importer))
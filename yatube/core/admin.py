@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from core.models import Job, SlowQuery
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'state', 'attempts', 'run_at', 'locked_by')
+    list_filter = ('state', 'name')
+    search_fields = ('name', 'last_error')
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'view', 'count', 'total_time', 'average',
+                    'max_time', 'last_seen')
+    list_filter = ('view',)
+    search_fields = ('sql', 'view')
+    ordering = ('-total_time',)
+    readonly_fields = ('fingerprint', 'sql', 'example', 'plan', 'view',
+                       'stack', 'count', 'total_time', 'max_time',
+                       'first_seen', 'last_seen')
+
+    def average(self, obj):
+        return round(obj.average_time, 2)
+    average.short_description = 'В среднем, мс'
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(SlowQuery, SlowQueryAdmin)
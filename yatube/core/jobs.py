@@ -0,0 +1,110 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи должны укладываться в JSON: в очередь кладутся
+    id и строки, а не объекты моделей.
+    """
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        REGISTRY[func.task_name] = func
+        return func
+    return register(func) if func else register
+
+
+def enqueue(func, *args, delay=0):
+    """Ставит задачу в очередь; в режиме TASKS_ALWAYS_EAGER сразу выполняет."""
+    if settings.TASKS_ALWAYS_EAGER:
+        return func(*args)
+    return Job.objects.create(
+        name=func.task_name,
+        payload=json.dumps(args),
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def discover():
+    """Подгружает tasks.py всех приложений, чтобы воркер знал задачи."""
+    autodiscover_modules('tasks')
+
+
+def claim(worker, limit):
+    """Забирает видимые задачи и прячет их на TASKS_VISIBILITY_TIMEOUT.
+
+    Если воркер упадёт, задача снова станет видна по истечении таймаута.
+    Условие run_at__lte в UPDATE не даёт двум воркерам взять одну задачу.
+    Задача, которая исчерпала попытки и всё равно снова видна, роняла
+    воркер (OOM, SIGKILL): retry() до неё не дошёл, и она помечается
+    FAILED здесь, а не берётся по кругу.
+    """
+    now = timezone.now()
+    hidden_until = now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    with transaction.atomic():
+        Job.objects.filter(
+            state=Job.QUEUED, run_at__lte=now,
+            attempts__gte=F('max_attempts'),
+        ).update(
+            state=Job.FAILED,
+            locked_by='',
+            last_error='Воркер не завершил задачу ни в одной из попыток.',
+        )
+        ids = list(Job.objects.filter(
+            state=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at').values_list('id', flat=True)[:limit])
+        Job.objects.filter(id__in=ids, run_at__lte=now).update(
+            run_at=hidden_until,
+            locked_by=worker,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=ids, locked_by=worker))
+
+
+def run(job_id):
+    """Выполняет взятую задачу: успех удаляет её, ошибка откладывает."""
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None:
+        return
+    try:
+        REGISTRY[job.name](*json.loads(job.payload))
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        retry(job, traceback.format_exc())
+    else:
+        job.delete()
+
+
+def retry(job, error):
+    job.last_error = error
+    job.locked_by = ''
+    if job.attempts >= job.max_attempts:
+        job.state = Job.FAILED
+    else:
+        job.run_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+    job.save(update_fields=['last_error', 'locked_by', 'state', 'run_at'])
+
+
+def work(worker, limit=10):
+    """Выполняет одну пачку задач в текущем процессе."""
+    jobs = claim(worker, limit)
+    for job in jobs:
+        run(job.pk)
+    return len(jobs)
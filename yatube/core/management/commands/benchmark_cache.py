@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+SQLITE_BACKEND = 'core.sqlite_cache.SQLiteCache'
+
+
+def _simulate(backend, location, params, keys, operations, seed, size):
+    """Один воркер: читает ключи по закону Ципфа, промах дозаписывает."""
+    cache = import_string(backend)(location, params)
+    rnd = random.Random(seed)
+    payload = b'x' * size
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        # keys ** random() — ранги с плотностью ~1/r, как у закона Ципфа.
+        key = f'bench:{int(keys ** rnd.random())}'
+        if cache.get(key) is None:
+            cache.set(key, payload, 300)
+        else:
+            hits += 1
+    return hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет одинаковую нагрузку из нескольких процессов через текущий '
+        'кэш из settings.CACHES и через общий SQLiteCache и сравнивает '
+        'долю попаданий и скорость.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=20000,
+                            help='Обращений к кэшу на процесс.')
+        parser.add_argument('--keys', type=int, default=5000)
+        parser.add_argument('--size', type=int, default=2048,
+                            help='Размер значения в байтах.')
+
+    def handle(self, *args, **options):
+        current = settings.CACHES['default']
+        directory = tempfile.mkdtemp()
+        setups = [
+            ('текущий', current['BACKEND'], current.get('LOCATION', ''),
+             current),
+            ('sqlite', SQLITE_BACKEND,
+             os.path.join(directory, 'cache.sqlite3'),
+             {'OPTIONS': {'MAX_ENTRIES': 100000}}),
+        ]
+        self.stdout.write(
+            f'{"кэш":>8} {"попаданий":>10} {"операций/с":>12}  бэкенд')
+        try:
+            for name, backend, location, params in setups:
+                hits, elapsed = self.run(backend, location, params, options)
+                total = options['processes'] * options['operations']
+                self.stdout.write(
+                    f'{name:>8} {hits / total:>10.1%} '
+                    f'{total / elapsed:>12.0f}  {backend}')
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, backend, location, params, options):
+        processes = options['processes']
+        pool = ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+        with pool:
+            results = list(pool.map(
+                _simulate,
+                [backend] * processes,
+                [location] * processes,
+                [params] * processes,
+                [options['keys']] * processes,
+                [options['operations']] * processes,
+                range(processes),
+                [options['size']] * processes,
+            ))
+        hits = sum(hits for hits, _ in results)
+        # Процессы работают параллельно: время — по самому долгому.
+        return hits, max(elapsed for _, elapsed in results)
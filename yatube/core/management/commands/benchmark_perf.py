@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core import perf
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает адрес попеременно вне выборки core.perf и в ней и '
+        'печатает медианы и цену замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Адрес, например /posts/1/.')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов каждого вида.')
+        parser.add_argument('--user', help='Войти этим пользователем.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            User = get_user_model()
+            try:
+                client.force_login(
+                    User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+
+        def send():
+            response = client.get(options['path'])
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{options["path"]}: ответ {response.status_code}')
+
+        with perf.production_settings():
+            perf.overhead(send, 5)  # прогрев
+            off, on, share = perf.overhead(send, options['requests'])
+        self.stdout.write(
+            f'{options["path"]}: вне выборки {off} мс, в выборке {on} мс, '
+            f'замеры {share:+.1%}')
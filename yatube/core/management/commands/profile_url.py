@@ -0,0 +1,57 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core import perf, profiler
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает адрес в этом процессе N секунд подряд под '
+        'выборочным профилировщиком и печатает таблицу функций или '
+        'collapsed stacks для flamegraph.pl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Адрес, например /posts/1/.')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--user', help='Войти этим пользователем.')
+        parser.add_argument('--format', choices=profiler.FORMATS,
+                            default='top')
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            User = get_user_model()
+            try:
+                client.force_login(
+                    User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        ident = threading.get_ident()
+        sampler = profiler.Sampler(lambda: (ident,), options['seconds'])
+        requests = 0
+        with perf.production_settings():
+            sampler.start()
+            try:
+                while sampler.is_alive():
+                    response = client.get(options['path'])
+                    requests += 1
+                    if response.status_code >= 400:
+                        raise CommandError(
+                            f'{options["path"]}: ответ '
+                            f'{response.status_code}')
+            finally:
+                sampler.stop()
+        title = (f'{options["path"]}: запросов {requests} за '
+                 f'{sampler.seconds:g} с, выборок {sampler.samples}')
+        text = profiler.report(sampler.stacks, options['format'], title)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(text)
+            self.stdout.write(title)
+        else:
+            self.stdout.write(text, ending='')
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+def _run_job(job_id):
+    jobs.discover()
+    jobs.run(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи фоновой очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Размер пула процессов; 0 — выполнять в этом процессе.')
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Сколько задач забирать за раз.')
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выбрать очередь до дна и выйти.')
+
+    def handle(self, *args, **options):
+        jobs.discover()
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        if options['processes']:
+            # spawn, а не fork: дочерние процессы заводят свои соединения
+            # с базой и не делят их с родителем.
+            pool = ProcessPoolExecutor(
+                options['processes'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            pool = None
+        try:
+            while True:
+                done = self.work_batch(worker, options['batch'], pool)
+                if not done:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+
+    def work_batch(self, worker, batch, pool):
+        if pool is None:
+            return jobs.work(worker, batch)
+        claimed = jobs.claim(worker, batch)
+        list(pool.map(_run_job, [job.pk for job in claimed]))
+        return len(claimed)
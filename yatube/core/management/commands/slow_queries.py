@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from core.models import SlowQuery
+
+ORDERS = {
+    'total': '-total_time',
+    'count': '-count',
+    'max': '-max_time',
+    'average': '-average',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает самые тяжёлые группы медленных запросов из журнала '
+        'core.slow_queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--by', choices=ORDERS, default='total',
+                            help='По чему сортировать.')
+        parser.add_argument('--view', help='Только запросы этого view.')
+        parser.add_argument('--plan', action='store_true',
+                            help='Печатать план и стек.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Очистить журнал.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f'Удалено групп: {deleted}')
+            return
+        queries = SlowQuery.objects.annotate(average=ExpressionWrapper(
+            F('total_time') / F('count'), output_field=FloatField()))
+        if options['view']:
+            queries = queries.filter(view=options['view'])
+        queries = queries.order_by(ORDERS[options['by']])[:options['top']]
+        self.stdout.write(
+            f'{"раз":>6}{"всего, мс":>12}{"среднее":>10}{"макс":>10}  '
+            f'view / запрос')
+        for query in queries:
+            self.stdout.write(
+                f'{query.count:>6}{query.total_time:>12.1f}'
+                f'{query.average:>10.1f}{query.max_time:>10.1f}  '
+                f'{query.view or "-"}\n{query.sql}')
+            if options['plan']:
+                self.stdout.write(f'План:\n{query.plan}\nСтек:\n{query.stack}')
+            self.stdout.write('')
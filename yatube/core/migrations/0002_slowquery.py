@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Отпечаток')),
+                ('sql', models.TextField(verbose_name='Запрос')),
+                ('example', models.TextField(verbose_name='Пример без значений параметров')),
+                ('plan', models.TextField(blank=True, verbose_name='План')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Раз')),
+                ('total_time', models.FloatField(default=0, verbose_name='Всего, мс')),
+                ('max_time', models.FloatField(default=0, verbose_name='Дольше всего, мс')),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'медленный запрос',
+                'verbose_name_plural': 'медленные запросы',
+            },
+        ),
+    ]
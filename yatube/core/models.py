@@ -0,0 +1,64 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенная задача фоновой очереди."""
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATES = (
+        (QUEUED, 'В очереди'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='[]')
+    state = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Видна с', default=timezone.now)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['state', 'run_at'],
+                name='job_state_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class SlowQuery(models.Model):
+    """Медленные запросы к базе, сгруппированные по отпечатку."""
+    fingerprint = models.CharField('Отпечаток', max_length=32, unique=True)
+    sql = models.TextField('Запрос')
+    example = models.TextField('Пример без значений параметров')
+    plan = models.TextField('План', blank=True)
+    view = models.CharField('View', max_length=200, blank=True)
+    stack = models.TextField('Стек', blank=True)
+    count = models.PositiveIntegerField('Раз', default=0)
+    total_time = models.FloatField('Всего, мс', default=0)
+    max_time = models.FloatField('Дольше всего, мс', default=0)
+    first_seen = models.DateTimeField('Впервые', default=timezone.now)
+    last_seen = models.DateTimeField('Последний раз', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'медленный запрос'
+        verbose_name_plural = 'медленные запросы'
+
+    def __str__(self):
+        return self.sql[:100]
+
+    @property
+    def average_time(self):
+        return self.total_time / self.count if self.count else 0
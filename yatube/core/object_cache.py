@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+# Сколько живут записи, которые сбрасываются явно, если кэш свой у
+# каждого процесса: сброс в одном воркере другие не увидят.
+LOCAL_TIMEOUT = 20
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_registry = []
+
+
+def shared_timeout(seconds):
+    """Срок записи в cache, которую сбрасывают сигналы и поколения.
+
+    С общим кэшем — seconds как есть. С кэшем процесса сбросы из
+    других воркеров сюда не доходят, и срок ограничен LOCAL_TIMEOUT.
+    """
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+        return LOCAL_TIMEOUT if seconds is None else min(
+            seconds, LOCAL_TIMEOUT)
+    return seconds
+
+
+class LocalLRU:
+    """Небольшой LRU в памяти процесса с временем жизни записей."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """(найдено, значение); устаревшая запись считается промахом."""
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.items.pop(key, None)
+                return False, None
+            self.items.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class ObjectCache:
+    """Объект по уникальному полю: память процесса, общий кэш, затем БД.
+
+    Отсутствие объекта тоже кэшируется, но ненадолго. invalidate()
+    чистит общий кэш и память своего процесса; в других процессах
+    запись живёт не дольше local_timeout.
+    """
+
+    def __init__(self, queryset, field, timeout=60 * 60,
+                 missing_timeout=60, local_size=512, local_timeout=10):
+        self.queryset = queryset
+        self.field = field
+        self.timeout = timeout
+        self.missing_timeout = missing_timeout
+        self.local = LocalLRU(local_size, local_timeout)
+        self.prefix = f'object:{queryset.model._meta.label_lower}:{field}'
+        _registry.append(self)
+
+    def key(self, value):
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'{self.prefix}:{digest}'
+
+    def get(self, value):
+        """Объект или None, если такого нет."""
+        key = self.key(value)
+        found, obj = self.local.get(key)
+        if found:
+            return obj
+        # В общем кэше лежит кортеж (obj,): None от cache.get — промах,
+        # а (None,) — запомненное отсутствие объекта.
+        entry = cache.get(key)
+        if entry is None:
+            obj = self.queryset.filter(**{self.field: value}).first()
+            timeout = self.timeout if obj else self.missing_timeout
+            cache.set(key, (obj,), shared_timeout(timeout))
+        else:
+            obj = entry[0]
+        self.local.set(key, obj)
+        return obj
+
+    def get_or_404(self, value):
+        obj = self.get(value)
+        if obj is None:
+            raise Http404(f'{self.queryset.model._meta.object_name} '
+                          f'{value} не найден')
+        return obj
+
+    def invalidate(self, *values):
+        keys = [self.key(value) for value in values if value is not None]
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many(keys)
+
+
+def clear_local():
+    """Очищает память процесса у всех кэшей объектов."""
+    for object_cache in _registry:
+        object_cache.local.clear()
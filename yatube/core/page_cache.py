@@ -0,0 +1,95 @@
+"""Кэш целых страниц для анонимных GET.
+
+Кэшируются только view, помеченные cache_anonymous(). Ключ включает
+адрес страницы и строку поколений от version_func, поэтому события,
+сдвигающие поколения, сбрасывают страницу без явного удаления.
+Попадание отдаётся из process_view: ни view, ни шаблоны, ни
+контекст-процессоры не выполняются.
+
+Запрос с cookie сессии в кэш не ходит совсем: вошедший пользователь
+не получит чужую страницу и не положит в кэш свою.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from core.object_cache import shared_timeout
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+
+def cache_anonymous(version_func):
+    """Разрешает кэшировать страницу view для анонимов.
+
+    version_func(request, *args, **kwargs) возвращает строку поколений,
+    от которых зависит страница, или None — тогда не кэшировать.
+    """
+    def decorator(view):
+        view.page_version = version_func
+        return view
+    return decorator
+
+
+def static_page(request, *args, **kwargs):
+    """Страница без поколений: живёт PAGE_CACHE_TIMEOUT."""
+    return ''
+
+
+class AnonymousPageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, '_page_cache_key', None)
+        if key is not None:
+            patch_vary_headers(response, ('Cookie',))
+            if self.cacheable(request, response):
+                cache.set(key, (
+                    response.status_code,
+                    response.content,
+                    list(response.items()),
+                ), shared_timeout(PAGE_CACHE_TIMEOUT))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        version_func = getattr(view_func, 'page_version', None)
+        if (version_func is None
+                or request.method not in ('GET', 'HEAD')
+                or settings.SESSION_COOKIE_NAME in request.COOKIES):
+            return None
+        version = version_func(request, *view_args, **view_kwargs)
+        if version is None:
+            return None
+        address = f'{request.get_host()}{request.get_full_path()}'
+        key = 'page:{}:{}'.format(
+            hashlib.md5(address.encode()).hexdigest(), version)
+        cached = cache.get(key)
+        if cached is None:
+            request._page_cache_key = key
+            return None
+        status, content, headers = cached
+        response = HttpResponse(content, status=status)
+        for name, value in headers:
+            response[name] = value
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')),
+            response=response,
+        )
+
+    def cacheable(self, request, response):
+        # Ответ, который ставит cookie (в том числе CSRF), — личный.
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+            and 'private' not in response.get('Cache-Control', '')
+        )
@@ -0,0 +1,250 @@
+"""Замеры каждого запроса: SQL, шаблоны, кэш и полное время.
+
+PerformanceMiddleware стоит первой в MIDDLEWARE и для доли запросов
+PERF_SAMPLE_RATE собирает запись о запросе:
+
+* имя view из resolver_match;
+* число и время запросов к базе — через connection.execute_wrapper;
+* время отрисовки шаблонов — считается только внешний render(), так
+  что включённые шаблоны и render_to_string внутри тегов не
+  складываются дважды, а SQL ленивых querysets входит в это время;
+* попадания и промахи кэша — считаются только внешние get()/get_many(),
+  поэтому промах L1 и попадание L2 в TieredCache — одно попадание;
+* полное время ответа.
+
+Запись уходит в заголовок Server-Timing, в логгер 'yatube.perf'
+(JSON, уровень INFO) и в кольцевой буфер процесса recent(). Вне
+выборки запрос идёт без счётчиков: обёртки кэша и шаблонов только
+проверяют, что записи нет.
+"""
+import functools
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('yatube.perf')
+
+_local = threading.local()
+_buffer = deque(maxlen=getattr(settings, 'PERF_BUFFER_SIZE', 1000))
+_MISSING = object()
+
+
+class Recorder:
+    """Счётчики одного запроса."""
+
+    __slots__ = ('started', 'sql_count', 'sql_time', 'template_time',
+                 'cache_hits', 'cache_misses', 'rendering', 'caching')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+        self.caching = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+    def record(self, request, response):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'time': time.time(),
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(time.perf_counter() - self.started),
+            'sql_count': self.sql_count,
+            'sql_ms': _ms(self.sql_time),
+            'template_ms': _ms(self.template_time),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def current():
+    """Запись текущего запроса или None вне выборки."""
+    return getattr(_local, 'recorder', None)
+
+
+def current_view():
+    """Имя view обрабатываемого запроса или None."""
+    match = getattr(getattr(_local, 'request', None), 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def recent(count=None):
+    """Последние записи процесса, от старых к новым."""
+    records = list(_buffer)
+    return records[-count:] if count else records
+
+
+def production_settings(**overrides):
+    """Настройки для замеров в этом процессе, как в бою.
+
+    DEBUG выключен: иначе подключается debug toolbar.
+    """
+    from django.test.utils import override_settings
+
+    return override_settings(DEBUG=False, **overrides)
+
+
+def overhead(send, requests):
+    """Медианы запроса вне выборки и в ней и доля разницы между ними.
+
+    send() выполняет один запрос. Запросы вне выборки и в ней
+    чередуются, чтобы прогрев и фоновая нагрузка доставались обоим
+    поровну. Обёртки install() стоят в обоих случаях: вне выборки они
+    только проверяют, что записи нет.
+    """
+    from django.test.utils import override_settings
+
+    timings = {0: [], 1: []}
+    for number in range(requests * 2):
+        rate = number % 2
+        with override_settings(PERF_SAMPLE_RATE=rate):
+            started = time.perf_counter()
+            send()
+            timings[rate].append(time.perf_counter() - started)
+    off, on = (statistics.median(timings[rate]) for rate in (0, 1))
+    return _ms(off), _ms(on), on / off - 1
+
+
+def server_timing(record):
+    return ', '.join((
+        f'total;dur={record["total_ms"]}',
+        f'sql;dur={record["sql_ms"]};desc="{record["sql_count"]} queries"',
+        f'tpl;dur={record["template_ms"]}',
+        f'cache;desc="{record["cache_hits"]} hits, '
+        f'{record["cache_misses"]} misses"',
+    ))
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Запрос виден и вне выборки: по нему core.slow_queries узнаёт
+        # view медленного запроса к базе.
+        _local.request = request
+        try:
+            return self.measure(request)
+        finally:
+            _local.request = None
+
+    def measure(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        recorder = _local.recorder = Recorder()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _local.recorder = None
+        record = recorder.record(request, response)
+        _buffer.append(record)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        recorder = current()
+        if recorder is None or recorder.rendering:
+            return render(self, *args, **kwargs)
+        recorder.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            recorder.template_time += time.perf_counter() - started
+            recorder.rendering = False
+    return wrapper
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        recorder = current()
+        if recorder is None or recorder.caching:
+            return get(self, key, default, version)
+        recorder.caching = True
+        try:
+            value = get(self, key, _MISSING, version)
+        finally:
+            recorder.caching = False
+        if value is _MISSING:
+            recorder.cache_misses += 1
+            return default
+        recorder.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        recorder = current()
+        if recorder is None or recorder.caching:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        recorder.caching = True
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            recorder.caching = False
+        recorder.cache_hits += len(found)
+        recorder.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _patch(cls, name, wrap):
+    method = cls.__dict__.get(name)
+    if method is not None and not getattr(method, '_perf', False):
+        wrapped = wrap(method)
+        wrapped._perf = True
+        setattr(cls, name, wrapped)
+
+
+def install():
+    """Оборачивает рендер шаблонов Django и чтение из кэшей settings.
+
+    Обёртки ставятся на классы один раз; вызывается из CoreConfig.ready().
+    """
+    from django.template.backends.django import Template
+    _patch(Template, 'render', _timed_render)
+    for params in settings.CACHES.values():
+        backend = import_string(params['BACKEND'])
+        for cls in backend.__mro__:
+            _patch(cls, 'get', _counted_get)
+            _patch(cls, 'get_many', _counted_get_many)
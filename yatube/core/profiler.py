@@ -0,0 +1,199 @@
+"""Выборочный профилировщик запросов для персонала.
+
+Поток Sampler раз в PROFILER_INTERVAL секунд снимает стеки нужных
+потоков через sys._current_frames() и считает одинаковые стеки.
+Код запросов не трассируется, поэтому замедление ограничено частотой
+выборки и глубиной стека, а не объёмом работы view. Выборке нужен GIL,
+так что она немного смещена к местам, где поток его отпускает, —
+вызовам ввода-вывода вроде os.stat().
+
+Профилировать можно:
+
+* один запрос — персоналу с параметром ?profile (ProfilerMiddleware);
+  вместо страницы придёт отчёт;
+* все запросы процесса за N секунд — /debug/profile/?seconds=N
+  (core.views.profile_requests); одновременно идёт только один такой
+  прогон. Снимаются другие потоки с запросами, так что воркеру нужны
+  потоки (gunicorn --threads 4 или --worker-class gthread): в
+  однопоточном воркере, пока ждёт этот запрос, других нет, и адрес
+  сразу отвечает 409;
+* адрес, который команда `manage.py profile_url` запрашивает сама.
+
+Отчёт — таблица функций по собственным и полным выборкам или
+collapsed stacks (`?format=collapsed`) для flamegraph.pl и speedscope.
+Без PROFILER_ENABLED всё это выключено.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import HttpResponse
+
+MAX_DEPTH = 100
+TOP_FUNCTIONS = 40
+# Один запрос короток, и снимается только его поток: выборка чаще.
+SINGLE_INTERVAL = 0.001
+FORMATS = ('top', 'collapsed')
+
+# Потоки, которые сейчас обрабатывают запрос: их и снимает прогон по
+# всем запросам процесса.
+_active = {}
+_running = threading.Lock()
+_labels = {}
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        roots = sorted({*sys.path, settings.BASE_DIR}, key=len, reverse=True)
+        for root in roots:
+            if root and path.startswith(root + os.sep):
+                path = path[len(root) + 1:]
+                break
+        label = _labels[code] = (
+            f'{code.co_name} ({path}:{code.co_firstlineno})')
+    return label
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки потоков targets() до stop() или истечения seconds.
+
+    targets — функция без аргументов, возвращающая идентификаторы
+    потоков; stacks — Counter стеков от корня к листу.
+    """
+
+    def __init__(self, targets, seconds=None, interval=None):
+        super().__init__(name='profiler', daemon=True)
+        self.targets = targets
+        if seconds is None:
+            seconds = settings.PROFILER_MAX_SECONDS
+        self.seconds = min(seconds, settings.PROFILER_MAX_SECONDS)
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.stacks = Counter()
+        self.samples = 0
+        self.finished = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic() + self.seconds
+        while (not self.finished.wait(self.interval)
+               and time.monotonic() < deadline):
+            frames = sys._current_frames()
+            for ident in self.targets():
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_stack(frame)] += 1
+                    self.samples += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+        return self.stacks
+
+
+def collapsed(stacks):
+    """Строки «кадр;кадр;… число» для flamegraph.pl."""
+    return ''.join(
+        f'{";".join(stack)} {count}\n'
+        for stack, count in sorted(stacks.items())
+    )
+
+
+def top(stacks, limit=TOP_FUNCTIONS):
+    """(функция, собственных выборок, полных выборок) по убыванию."""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+    return sorted(
+        ((label, own[label], total[label]) for label in total),
+        key=lambda row: (-row[1], -row[2], row[0]),
+    )[:limit]
+
+
+def report(stacks, format='top', title=''):
+    if format == 'collapsed':
+        return collapsed(stacks)
+    samples = sum(stacks.values()) or 1
+    lines = [title] if title else []
+    lines.append(f'{"своих":>7}{"всего":>7}  функция')
+    for label, own, total in top(stacks):
+        lines.append(f'{own / samples:>7.1%}{total / samples:>7.1%}  {label}')
+    return '\n'.join(lines) + '\n'
+
+
+def active_requests(exclude=None):
+    """Потоки, которые сейчас обрабатывают запрос, кроме exclude."""
+    # list() копирует словарь целиком, не отпуская GIL.
+    return [ident for ident in list(_active) if ident != exclude]
+
+
+def profile_active(seconds, exclude=None):
+    """Профилирует потоки всех запросов процесса seconds секунд.
+
+    Возвращает None, если уже идёт другой такой прогон.
+    """
+    if not _running.acquire(blocking=False):
+        return None
+    try:
+        sampler = Sampler(lambda: active_requests(exclude), seconds)
+        sampler.start()
+        sampler.join()
+        return sampler
+    finally:
+        _running.release()
+
+
+def report_response(sampler, format, title):
+    return HttpResponse(
+        report(sampler.stacks, format, title),
+        content_type='text/plain; charset=utf-8',
+    )
+
+
+class ProfilerMiddleware:
+    """Учитывает потоки с запросами и профилирует запрос с ?profile."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        ident = threading.get_ident()
+        _active[ident] = request.path
+        try:
+            if (settings.PROFILER_ENABLED
+                    and settings.PROFILER_PARAM in request.GET
+                    and request.user.is_staff):
+                return self.profile(request, ident)
+            return self.get_response(request)
+        finally:
+            _active.pop(ident, None)
+
+    def profile(self, request, ident):
+        sampler = Sampler(lambda: (ident,), interval=SINGLE_INTERVAL)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        format = request.GET[settings.PROFILER_PARAM]
+        title = (
+            f'{request.get_full_path()}: ответ {response.status_code} за '
+            f'{(time.perf_counter() - started) * 1000:.1f} мс, '
+            f'выборок {sampler.samples}'
+        )
+        return report_response(
+            sampler, format if format in FORMATS else 'top', title)
@@ -0,0 +1,139 @@
+"""Журнал медленных запросов к базе.
+
+На каждое соединение (сигнал connection_created) ставится обёртка
+execute: запрос дольше SLOW_QUERY_MS попадает в модель SlowQuery
+вместе с view (core.perf.current_view), стеком кода проекта и планом
+`EXPLAIN QUERY PLAN`. Запросы группируются по отпечатку — тексту без
+литералов и с одним `(...)` вместо списков параметров, — так что
+`id IN (1, 2)` и `id IN (3, 4, 5)` копятся в одной строке.
+
+Значения параметров в журнал не пишутся: среди них бывают хэши
+паролей и данные сессий. Пример — текст запроса с плейсхолдерами.
+Упавшие запросы не журналируются.
+
+Запись в журнал идёт в той же транзакции, что и медленный запрос:
+откат транзакции откатывает и её. Сама запись — в своей точке
+сохранения: ошибка журнала (например, гонка двух процессов за новый
+отпечаток) откатывает только её и не ломает транзакцию запроса.
+"""
+import hashlib
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core import perf
+
+STACK_DEPTH = 15
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+_local = threading.local()
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalize(sql):
+    """Текст запроса без литералов и длины списков параметров."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()
+
+
+def _stack():
+    """Кадры кода проекта, от внешнего к ближайшему."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in frame.filename
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def _explain(connection, sql, params, many):
+    if many or not sql.lstrip().upper().startswith(EXPLAINED):
+        return ''
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(
+                ' '.join(str(value) for value in row)
+                for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f'EXPLAIN не удался: {error}'
+
+
+def record(connection, sql, params, many, elapsed):
+    """Добавляет медленный запрос к его группе в SlowQuery."""
+    from core.models import SlowQuery
+
+    if SlowQuery._meta.db_table in sql:
+        # Чтение и очистка самого журнала.
+        return
+    key = fingerprint(sql)
+    fields = {
+        'example': sql,
+        'plan': _explain(connection, sql, params, many),
+        'view': perf.current_view() or '',
+        'stack': _stack(),
+        'last_seen': timezone.now(),
+    }
+    using = connection.alias
+    with transaction.atomic(using=using):
+        updated = SlowQuery.objects.using(using).filter(
+            fingerprint=key
+        ).update(
+            count=F('count') + 1,
+            total_time=F('total_time') + elapsed,
+            max_time=Greatest('max_time', elapsed),
+            **fields,
+        )
+        if not updated:
+            SlowQuery.objects.using(using).create(
+                fingerprint=key, sql=normalize(sql), count=1,
+                total_time=elapsed, max_time=elapsed, **fields)
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_MS
+    if threshold is None or getattr(_local, 'busy', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed = (time.perf_counter() - started) * 1000
+    if elapsed >= threshold:
+        # Запросы самого журнала и EXPLAIN не журналируются.
+        _local.busy = True
+        try:
+            record(context['connection'], sql, params, many, elapsed)
+        except DatabaseError:
+            pass
+        finally:
+            _local.busy = False
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """Ставит обёртку на новое соединение (сигнал connection_created).
+
+    Обёртка встаёт в начало execute_wrappers: контекстные
+    connection.execute_wrapper() снимают с конца свои.
+    """
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
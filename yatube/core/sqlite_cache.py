@@ -0,0 +1,222 @@
+"""Общий для всех процессов кэш в файле SQLite.
+
+Воркеры одной машины открывают один файл: фрагменты, карточки и
+счётчики поколений видны всем сразу, а сброс в одном процессе доходит
+до остальных. Внешний сервис не нужен.
+
+Файл открыт в режиме WAL (чтение не ждёт записи), а страницы читаются
+через mmap. Переполнение вытесняет давно не читанные записи (LRU).
+Целые числа хранятся как INTEGER, поэтому incr() — один UPDATE.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB,
+        expires REAL,
+        accessed REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+    CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+'''
+LIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    """Кэш Django в файле SQLite, общий для процессов одной машины.
+
+    OPTIONS помимо стандартных MAX_ENTRIES и CULL_FREQUENCY:
+    MMAP_SIZE — сколько байт файла читать через mmap;
+    CULL_EVERY — проверять переполнение раз в столько записей;
+    TOUCH_AFTER — не чаще раза в столько секунд отмечать чтение ключа.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.mmap_size = int(options.get('MMAP_SIZE', 256 * 2 ** 20))
+        self.cull_every = int(options.get('CULL_EVERY', 100))
+        self.touch_after = float(options.get('TOUCH_AFTER', 1))
+        self.local = threading.local()
+
+    @property
+    def db(self):
+        # Соединение своё у каждого потока и процесса: после fork
+        # унаследованное соединение не используется.
+        local = self.local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(f'PRAGMA mmap_size={self.mmap_size}')
+            db.executescript(SCHEMA)
+            local.db, local.pid, local.writes = db, os.getpid(), 0
+        return local.db
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return sqlite3.Binary(
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        marks = ', '.join('?' * len(keys))
+        rows = self.db.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({marks}) AND {LIVE}',
+            [*keys, now],
+        ).fetchall()
+        stale = [row[0] for row in rows if row[2] < now - self.touch_after]
+        if stale:
+            # Отметка чтения — это запись, поэтому не на каждый get.
+            marks = ', '.join('?' * len(stale))
+            self.db.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({marks})',
+                [now, *stale])
+        return {keys[key]: self._decode(value) for key, value, _ in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self._key(key, version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+        self._maybe_cull(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        with self._transaction() as db:
+            db.execute(
+                f'DELETE FROM cache WHERE key = ? AND NOT {LIVE}',
+                [key, now])
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                [key, self._encode(value), expires, now],
+            ).rowcount
+        self._maybe_cull(added)
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as db:
+            updated = db.execute(
+                f'UPDATE cache SET value = value + ? WHERE key = ? '
+                f"AND typeof(value) = 'integer' AND {LIVE}",
+                [delta, key, time.time()],
+            ).rowcount
+            if not updated:
+                raise ValueError(f"Key '{key}' not found")
+            return db.execute(
+                'SELECT value FROM cache WHERE key = ?', [key]
+            ).fetchone()[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self.db.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}',
+            [self.get_backend_timeout(timeout), key, time.time()],
+        ).rowcount)
+
+    def has_key(self, key, version=None):
+        return self.db.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {LIVE}',
+            [self._key(key, version), time.time()],
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            marks = ', '.join('?' * len(keys))
+            self.db.execute(f'DELETE FROM cache WHERE key IN ({marks})', keys)
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь процесс: между запросами его не закрываем.
+        pass
+
+    def _transaction(self):
+        return _Immediate(self.db)
+
+    def _maybe_cull(self, written):
+        local = self.local
+        local.writes += written
+        if local.writes < self.cull_every:
+            return
+        local.writes = 0
+        self.cull()
+
+    def cull(self):
+        """Удаляет истёкшие записи, а при переполнении — давно не читанные."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache WHERE expires <= ?', [now])
+            count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self._max_entries and not self._cull_frequency:
+                db.execute('DELETE FROM cache')
+            elif count > self._max_entries:
+                db.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                    'ORDER BY accessed LIMIT ?)',
+                    [count // self._cull_frequency or 1])
+
+
+class _Immediate:
+    """Транзакция BEGIN IMMEDIATE.
+
+    Блокировка на запись берётся сразу, а не при первом UPDATE,
+    поэтому чтение и запись внутри неё атомарны для всех процессов.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
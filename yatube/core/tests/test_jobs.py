@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+User = get_user_model()
+CALLS = []
+
+
+@jobs.task
+def remember(value):
+    CALLS.append(value)
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    raise RuntimeError('бум')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_job_runs_once(self):
+        jobs.enqueue(remember, 'значение')
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(jobs.work('test'), 1)
+        self.assertEqual(CALLS, ['значение'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_job_is_hidden_from_other_workers(self):
+        jobs.enqueue(remember, 1)
+        self.assertEqual(len(jobs.claim('first', 10)), 1)
+        self.assertEqual(jobs.claim('second', 10), [])
+        # Воркер пропал: по истечении таймаута задача снова видна
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(jobs.claim('second', 10)), 1)
+
+    def test_failing_job_is_retried_then_failed(self):
+        jobs.enqueue(explode)
+        jobs.work('test')
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.update(run_at=timezone.now())
+        jobs.work('test')
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertIn('бум', job.last_error)
+
+    def test_job_that_kills_worker_fails_after_max_attempts(self):
+        jobs.enqueue(explode)
+        for worker in ('first', 'second'):
+            # Воркер взял задачу и пропал, не дойдя до retry()
+            self.assertEqual(len(jobs.claim(worker, 10)), 1)
+            Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.claim('third', 10), [])
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_password_reset_mail_goes_through_queue(self):
+        User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass')
+        Client().post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Job.objects.filter(
+            name='users.tasks.send_email').exists())
+        jobs.work('test')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.object_cache import LOCAL_TIMEOUT, LocalLRU, shared_timeout
+
+
+class LocalLRUTest(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        lru = LocalLRU(size=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), (True, 1))
+        self.assertEqual(lru.get('b'), (False, None))
+        self.assertEqual(lru.get('c'), (True, 3))
+
+    def test_entries_expire(self):
+        lru = LocalLRU(size=2, timeout=10)
+        with mock.patch('core.object_cache.time.monotonic', return_value=0):
+            lru.set('a', None)
+            self.assertEqual(lru.get('a'), (True, None))
+        with mock.patch('core.object_cache.time.monotonic', return_value=11):
+            self.assertEqual(lru.get('a'), (False, None))
+
+
+class SharedTimeoutTest(SimpleTestCase):
+    def test_process_local_cache_caps_timeout(self):
+        # Сбросы из других воркеров до LocMemCache не доходят
+        self.assertEqual(shared_timeout(None), LOCAL_TIMEOUT)
+        self.assertEqual(shared_timeout(3600), LOCAL_TIMEOUT)
+        self.assertEqual(shared_timeout(5), 5)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': ':memory:',
+    }})
+    def test_shared_cache_keeps_timeout(self):
+        self.assertIsNone(shared_timeout(None))
+        self.assertEqual(shared_timeout(3600), 3600)
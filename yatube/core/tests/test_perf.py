@@ -0,0 +1,89 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import perf
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(PERF_SAMPLE_RATE=1)
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_record_matches_request(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = Client().get(reverse('posts:index'))
+        record = perf.recent(1)[0]
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['sql_count'], len(captured))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['sql_ms'])
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'sql;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(metric, timing)
+        self.assertIn(f'"{len(captured)} queries"', timing)
+
+    def test_cached_page_is_a_hit_without_templates(self):
+        Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:index'))
+        record = perf.recent(1)[0]
+        self.assertGreater(record['cache_hits'], 0)
+        self.assertEqual(record['template_ms'], 0)
+
+    def test_get_many_counts_every_key(self):
+        cache.set('a', 1)
+        recorder = perf._local.recorder = perf.Recorder()
+        try:
+            self.assertEqual(cache.get_many(['a', 'b']), {'a': 1})
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual(cache.get('b', 'нет'), 'нет')
+        finally:
+            perf._local.recorder = None
+        self.assertEqual(recorder.cache_hits, 1)
+        self.assertEqual(recorder.cache_misses, 3)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_recorded(self):
+        before = perf.recent()
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(perf.recent(), before)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(perf.recent(1)[0]['view'], 'posts:index')
+
+    def test_overhead_compares_sampled_and_unsampled(self):
+        client = Client()
+        perf._buffer.clear()
+        off, on, share = perf.overhead(
+            lambda: client.get(reverse('posts:index')), 20)
+        self.assertEqual(len(perf.recent()), 20)
+        self.assertGreater(off, 0)
+        self.assertGreater(on, 0)
+        # Замер грубый, но на порядок дороже запроса выборка быть не должна.
+        self.assertLess(share, 1)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_perf', reverse('posts:index'),
+                     requests=3, stdout=out)
+        self.assertIn('замеры', out.getvalue())
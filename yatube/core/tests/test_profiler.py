@@ -0,0 +1,126 @@
+import io
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiler
+
+User = get_user_model()
+
+
+def spin(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class SamplerTest(TestCase):
+    def test_busy_thread_is_sampled(self):
+        worker = threading.Thread(target=spin, args=(0.3,))
+        worker.start()
+        sampler = profiler.Sampler(lambda: (worker.ident,), interval=0.005)
+        sampler.start()
+        worker.join()
+        stacks = sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        self.assertTrue(any(
+            stack[-1].startswith('spin (') for stack in stacks))
+
+    def test_reports(self):
+        stacks = Counter({('a', 'b'): 3, ('a', 'c'): 1})
+        self.assertEqual(profiler.collapsed(stacks), 'a;b 3\na;c 1\n')
+        self.assertEqual(profiler.top(stacks),
+                         [('b', 3, 3), ('c', 1, 1), ('a', 0, 4)])
+        self.assertIn(' 75.0%', profiler.report(stacks, title='Профиль'))
+
+
+class ProfilerViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_off_by_default(self):
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 'top'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        response = self.staff_client.get(reverse('core:profile'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PROFILER_ENABLED=True)
+    def test_single_request(self):
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 'top'})
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('ответ 200', response.content.decode())
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 'collapsed'})
+        self.assertNotIn('ответ 200', response.content.decode())
+        response = self.user_client.get(
+            reverse('posts:index'), {'profile': 'top'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+
+    @override_settings(PROFILER_ENABLED=True)
+    def test_live_requests(self):
+        url = reverse('core:profile')
+        # Соседний поток с «запросом»: тестовый клиент однопоточный.
+        worker = threading.Thread(target=spin, args=(0.3,))
+        worker.start()
+        profiler._active[worker.ident] = '/slow/'
+        try:
+            response = self.staff_client.get(url, {'seconds': 0.1})
+            with profiler._running:
+                self.assertEqual(self.staff_client.get(url).status_code, 409)
+        finally:
+            profiler._active.pop(worker.ident)
+            worker.join()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('spin (', response.content.decode())
+        self.assertEqual(self.user_client.get(url).status_code, 404)
+
+    @override_settings(PROFILER_ENABLED=True)
+    def test_bad_seconds(self):
+        url = reverse('core:profile')
+        for seconds in ('x', '0', '-1', 'nan', 'inf'):
+            with self.subTest(seconds=seconds):
+                response = self.staff_client.get(url, {'seconds': seconds})
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(PROFILER_ENABLED=True)
+    def test_no_other_requests(self):
+        started = time.monotonic()
+        response = self.staff_client.get(
+            reverse('core:profile'), {'seconds': 30})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('gunicorn --threads', response.content.decode())
+        self.assertLess(time.monotonic() - started, 1)
+
+    @override_settings(PROFILER_MAX_SECONDS=0.1)
+    def test_duration_is_capped(self):
+        self.assertEqual(profiler.Sampler(lambda: (), 100).seconds, 0.1)
+        self.assertEqual(profiler.Sampler(lambda: ()).seconds, 0.1)
+
+
+class ProfileUrlCommandTest(TestCase):
+    def test_command(self):
+        User.objects.create_user(username='reader')
+        out = io.StringIO()
+        call_command('profile_url', reverse('posts:index'), seconds=0.2,
+                     user='reader', stdout=out)
+        self.assertIn('функция', out.getvalue())
+        out = io.StringIO()
+        call_command('profile_url', reverse('posts:index'), seconds=0.2,
+                     format='collapsed', stdout=out)
+        self.assertIn(';handle (core/management/commands/profile_url.py',
+                      out.getvalue())
@@ -0,0 +1,96 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import slow_queries
+from core.models import SlowQuery
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_MS=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_fingerprint_ignores_literals_and_list_length(self):
+        self.assertEqual(
+            slow_queries.fingerprint(
+                'SELECT * FROM t WHERE id IN (%s, %s) '
+                "AND name = 'a' LIMIT 21"),
+            slow_queries.fingerprint(
+                'SELECT * FROM t WHERE id IN (%s, %s, %s)\n'
+                "  AND name = 'b''c' LIMIT 5"),
+        )
+        self.assertEqual(
+            slow_queries.normalize('INSERT INTO t2 VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t2 VALUES (...)')
+
+    def test_same_query_is_grouped_with_plan(self):
+        list(Post.objects.filter(id__in=[1, 2]))
+        list(Post.objects.filter(id__in=[1, 2, 3]))
+        entry = SlowQuery.objects.get(sql__contains='"posts_post"."id" IN')
+        self.assertEqual(entry.count, 2)
+        self.assertIn('posts_post', entry.plan)
+        self.assertIn('test_slow_queries.py', entry.stack)
+        self.assertGreaterEqual(entry.max_time, entry.total_time / 2)
+
+    def test_parameter_values_are_not_stored(self):
+        list(Post.objects.filter(text='секретное значение'))
+        entry = SlowQuery.objects.get(sql__contains='"posts_post"."text" =')
+        self.assertNotIn('секретное значение', entry.example)
+        self.assertIn('%s', entry.example)
+
+    def test_failed_query_is_not_recorded(self):
+        logged = SlowQuery.objects.count()
+        with self.assertRaises(DatabaseError):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT * FROM no_such_table WHERE id = %s',
+                               [1])
+        self.assertEqual(SlowQuery.objects.count(), logged)
+
+    def test_log_race_keeps_transaction_usable(self):
+        # Другой процесс успел создать строку с тем же отпечатком
+        list(Post.objects.filter(text='гонка'))
+        with transaction.atomic():
+            with mock.patch('django.db.models.query.QuerySet.update',
+                            return_value=0):
+                list(Post.objects.filter(text='гонка'))
+            self.assertEqual(Post.objects.filter(pk=self.post.pk).count(), 1)
+        entry = SlowQuery.objects.get(sql__contains='"posts_post"."text" =')
+        self.assertEqual(entry.count, 1)
+
+    def test_view_is_recorded(self):
+        Client().get(reverse('posts:post_detail', args=[self.post.id]))
+        self.assertTrue(SlowQuery.objects.filter(
+            view='posts:post_detail').exists())
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled(self):
+        logged = SlowQuery.objects.count()
+        list(Post.objects.all())
+        self.assertEqual(SlowQuery.objects.count(), logged)
+
+    def test_command_and_admin(self):
+        list(Post.objects.all())
+        out = io.StringIO()
+        call_command('slow_queries', top=100, by='count', plan=True,
+                     stdout=out)
+        self.assertIn('FROM "posts_post"', out.getvalue())
+        self.assertIn('План:', out.getvalue())
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:core_slowquery_changelist'))
+        self.assertEqual(response.status_code, 200)
+        call_command('slow_queries', clear=True, stdout=io.StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
@@ -0,0 +1,69 @@
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from core.sqlite_cache import SQLiteCache
+
+
+def _cache(path, **options):
+    return SQLiteCache(str(path), {'OPTIONS': options})
+
+
+def _bump(path, times):
+    cache = _cache(path)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.path = self.directory / 'cache.sqlite3'
+        self.cache = _cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_are_shared_between_instances(self):
+        self.cache.set('card', {'html': '<p>Пост</p>'})
+        self.cache.set('forever', 'значение', None)
+        other = _cache(self.path)
+        self.assertEqual(other.get('card'), {'html': '<p>Пост</p>'})
+        self.assertEqual(other.get_many(['forever', 'nope']),
+                         {'forever': 'значение'})
+        other.delete('card')
+        self.assertIsNone(self.cache.get('card'))
+
+    def test_expired_values_are_misses(self):
+        self.cache.set('gone', 1, 0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertFalse(self.cache.add('gone', 3))
+        self.assertEqual(self.cache.get('gone'), 2)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        pool = ProcessPoolExecutor(
+            4, mp_context=multiprocessing.get_context('spawn'))
+        with pool:
+            list(pool.map(_bump, [self.path] * 4, [50] * 4))
+        self.assertEqual(self.cache.get('counter'), 200)
+        self.assertEqual(self.cache.incr('counter', 10), 210)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_overflow_evicts_least_recently_read(self):
+        cache = _cache(self.path, MAX_ENTRIES=4, CULL_FREQUENCY=2,
+                       CULL_EVERY=1, TOUCH_AFTER=0)
+        for number in range(4):
+            cache.set(f'key{number}', number)
+        cache.get('key0')
+        cache.get('key1')
+        cache.set('key4', 4)
+        self.assertEqual(
+            sorted(cache.get_many([f'key{n}' for n in range(5)])),
+            ['key0', 'key1', 'key4'])
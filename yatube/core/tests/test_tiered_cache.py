@@ -0,0 +1,103 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.signals import request_finished
+from django.test import SimpleTestCase
+
+from core.tiered_cache import TieredCache
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = TieredCache('', {'OPTIONS': {'LOCK_TIMEOUT': 2}})
+        self.cache.clear()
+
+    def in_threads(self, func, count=8):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(func()))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_l1_serves_without_l2(self):
+        self.cache.set('key', 'значение')
+        caches['default'].clear()
+        self.assertEqual(self.cache.get('key'), 'значение')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_concurrent_misses_rebuild_once(self):
+        calls = []
+
+        def rebuild():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'фрагмент'
+
+        results = self.in_threads(
+            lambda: self.cache.get_or_set('page', rebuild, 60))
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['фрагмент'] * 8)
+
+    def test_early_expiration_refreshes_once(self):
+        # Пересборка шла 10 с, а до срока осталась 1 с: XFetch почти
+        # наверняка сочтёт значение истёкшим
+        key = self.cache.make_key('page')
+        caches['default'].set(key, ('старое', 10, time.time() + 1), 60)
+        with mock.patch('core.tiered_cache.random.random', return_value=0.5):
+            self.assertIsNone(self.cache.get('page'))
+            others = self.in_threads(lambda: self.cache.get('page'), 4)
+        self.assertEqual(others, ['старое'] * 4)
+        self.cache.set('page', 'новое', 60)
+        self.assertEqual(self.cache.get('page'), 'новое')
+
+    def test_expired_l1_entry_is_a_miss(self):
+        self.cache.set('short', 'значение', 1)
+        with mock.patch('core.tiered_cache.time.time',
+                        return_value=time.time() + 2):
+            self.assertIsNone(self.cache.get('short'))
+
+    def test_failed_rebuild_releases_waiters(self):
+        started, fail = threading.Event(), threading.Event()
+
+        def broken():
+            started.set()
+            fail.wait()
+            raise ValueError('пересборка упала')
+
+        def leader():
+            with self.assertRaises(ValueError):
+                self.cache.get_or_set('page', broken, 60)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait()
+        # Ведущий падает, когда этот поток уже ждёт его set().
+        threading.Timer(0.1, fail.set).start()
+        begun = time.monotonic()
+        value = self.cache.get_or_set('page', lambda: 'фрагмент', 60)
+        thread.join()
+        self.assertEqual(value, 'фрагмент')
+        self.assertLess(time.monotonic() - begun, 1)
+
+    def test_request_end_releases_fragment_flight(self):
+        # Тег {% cache %} читает get() и не доходит до set(), если
+        # отрисовка фрагмента упала.
+        self.assertIsNone(self.cache.get('fragment'))
+        key = self.cache.make_key('fragment')
+        self.assertIn(key, self.cache.flights)
+        request_finished.send(sender=self.__class__)
+        self.assertNotIn(key, self.cache.flights)
+
+    def test_threads_share_flights(self):
+        other = self.in_threads(
+            lambda: TieredCache('', {'OPTIONS': {'LOCK_TIMEOUT': 2}}), 1)[0]
+        self.assertIs(other.flights, self.cache.flights)
+        self.assertIs(other.l1, self.cache.l1)
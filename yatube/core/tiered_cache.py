@@ -0,0 +1,206 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем Django.
+
+Подключается как отдельный алиас в settings.CACHES и годится для
+`{% cache ... using="tiered" %}` и для get_or_set() в коде. Кроме L1
+он защищает от лавины пересборок:
+
+* склейка запросов — после промаха ключ пересобирает один поток
+  процесса, остальные ждут его set() (не дольше LOCK_TIMEOUT). Если
+  пересборка упала, её снимает abandon() в get_or_set(), а брошенные
+  тегом `{% cache %}` — конец запроса (сигнал request_finished);
+* вероятностное раннее истечение (XFetch) — незадолго до срока один
+  из запросов получает промах и пересобирает значение, пока остальные
+  ещё читают старое. Чем дольше пересборка, тем раньше это случается.
+"""
+import math
+import random
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_finished
+
+from core.object_cache import LocalLRU
+
+# Django создаёт экземпляр бэкенда на каждый поток, а L1 и пересборки
+# должны быть общими для процесса: (L1, пересборки, замок) по настройкам.
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class _Flight:
+    """Пересборка ключа, которую ведёт один поток."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.thread = threading.get_ident()
+        self.done = threading.Event()
+
+
+class TieredCache(BaseCache):
+    """Кэш Django поверх другого алиаса с L1 в памяти процесса.
+
+    OPTIONS: L2 — алиас общего кэша; L1_SIZE и L1_TIMEOUT — размер и
+    срок жизни записей в памяти; BETA — насколько рано истекать;
+    LOCK_TIMEOUT — сколько ждать чужую пересборку.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'default')
+        size = int(options.get('L1_SIZE', 1000))
+        l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self.beta = float(options.get('BETA', 1))
+        self.lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        shared_key = (location, self.l2_alias, size, l1_timeout)
+        with _shared_lock:
+            if shared_key not in _shared:
+                _shared[shared_key] = (
+                    LocalLRU(size, l1_timeout), {}, threading.Lock())
+            self.l1, self.flights, self.lock = _shared[shared_key]
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _lookup(self, key):
+        # Запись — кортеж (значение, время пересборки, срок по time.time()
+        # или None для бессрочных).
+        found, entry = self.l1.get(key)
+        if not found:
+            entry = self.l2.get(key)
+            if entry is not None:
+                self.l1.set(key, entry)
+        if entry is not None and entry[2] is not None and (
+                entry[2] <= time.time()):
+            # L1 живёт своим сроком и не должен пережить саму запись.
+            self.l1.delete(key)
+            return None
+        return entry
+
+    def _early(self, entry):
+        _, delta, expires = entry
+        if expires is None or not delta:
+            return False
+        # 1 - random() лежит в (0, 1], так что логарифм определён.
+        gap = -delta * self.beta * math.log(1 - random.random())
+        return time.time() + gap >= expires
+
+    def _start(self, key):
+        """Возвращает (ведущий ли поток, пересборка)."""
+        with self.lock:
+            flight = self.flights.get(key)
+            now = time.monotonic()
+            if flight is None or now - flight.started > self.lock_timeout:
+                flight = self.flights[key] = _Flight()
+                return True, flight
+            return flight.thread == threading.get_ident(), flight
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        entry = self._lookup(key)
+        if entry is not None and not self._early(entry):
+            return entry[0]
+        leader, flight = self._start(key)
+        if leader:
+            return default
+        if entry is not None:
+            # Значение ещё не истекло: пока его пересобирают, отдаём его.
+            return entry[0]
+        flight.done.wait(
+            self.lock_timeout - (time.monotonic() - flight.started))
+        entry = self._lookup(key)
+        return default if entry is None else entry[0]
+
+    def _finish(self, key):
+        with self.lock:
+            return self.flights.pop(key, None)
+
+    def abandon(self, key, version=None):
+        """Снимает пересборку ключа, не записав значения.
+
+        Ждущие потоки сразу получают промах и пересобирают сами.
+        """
+        flight = self._finish(self._key(key, version))
+        if flight:
+            flight.done.set()
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        flight = self._finish(key)
+        delta = time.monotonic() - flight.started if flight else 0
+        timeout = self.get_backend_timeout(timeout)
+        entry = (value, delta, timeout)
+        self.l2.set(key, entry, None if timeout is None else max(
+            timeout - time.time(), 0))
+        self.l1.set(key, entry)
+        if flight:
+            flight.done.set()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        # Базовая версия пишет через add(), а при раннем истечении ключ
+        # ещё существует: значение надо перезаписать.
+        value = self.get(key, version=version)
+        if value is None:
+            try:
+                value = default() if callable(default) else default
+            except BaseException:
+                self.abandon(key, version)
+                raise
+            if value is None:
+                self.abandon(key, version)
+            else:
+                self.set(key, value, timeout, version)
+        return value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version=version):
+            return False
+        self.set(key, value, timeout, version)
+        return True
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def has_key(self, key, version=None):
+        return self._lookup(self._key(key, version)) is not None
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        entry = self._lookup(self._key(key, version))
+        if entry is None:
+            return False
+        self.set(key, entry[0], timeout, version)
+        return True
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+
+def release_thread(**kwargs):
+    """Снимает пересборки, брошенные потоком к концу запроса.
+
+    Тег {% cache %} не вызывает set(), если отрисовка фрагмента упала.
+    """
+    ident = threading.get_ident()
+    for _, flights, lock in list(_shared.values()):
+        with lock:
+            abandoned = [
+                flights.pop(key) for key, flight in list(flights.items())
+                if flight.thread == ident
+            ]
+        for flight in abandoned:
+            flight.done.set()
+
+
+request_finished.connect(release_thread)
@@ -1,5 +1,14 @@
 # core/views.py
+import math
+import os
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from core import profiler
 
 
 def page_not_found(request, exception):
@@ -16,3 +25,32 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@require_safe
+def profile_requests(request):
+    """Профиль всех запросов этого процесса за ?seconds секунд."""
+    # Для остальных адреса нет вовсе, как и при выключенном профилировщике.
+    if not settings.PROFILER_ENABLED or not request.user.is_staff:
+        raise Http404
+    try:
+        seconds = float(request.GET.get('seconds', 10))
+    except ValueError:
+        seconds = math.nan
+    if not math.isfinite(seconds) or seconds <= 0:
+        return HttpResponseBadRequest('seconds — положительное число секунд')
+    ident = threading.get_ident()
+    if not profiler.active_requests(exclude=ident):
+        # В однопоточном воркере других запросов не бывает: профиль
+        # вышел бы пустым, а воркер простоял бы все seconds.
+        return HttpResponse(
+            'Других запросов в процессе нет: профилю нужен воркер с '
+            'потоками (gunicorn --threads)', status=409)
+    sampler = profiler.profile_active(seconds, exclude=ident)
+    if sampler is None:
+        return HttpResponse('Профилировщик уже запущен', status=409)
+    format = request.GET.get('format', 'top')
+    title = (f'Процесс {os.getpid()}, {sampler.seconds:g} с, '
+             f'выборок {sampler.samples}')
+    return profiler.report_response(
+        sampler, format if format in profiler.FORMATS else 'top', title)
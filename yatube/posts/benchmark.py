@@ -0,0 +1,194 @@
+"""Нагрузочный прогон адресов posts/urls.py.
+
+Каждый адрес запрашивается много раз с разными параметрами: посты,
+авторы и группы выбираются по степенному закону, как их выбирают
+живые читатели. Глубже в ленты ходят по ссылкам «Следующая» с
+?cursor=, как браузер: ?page=N — старый путь с OFFSET. Задержка
+меряется без инструментов, а запросы к базе и память — отдельным
+коротким проходом: tracemalloc замедляет код.
+"""
+import random
+import re
+import time
+import tracemalloc
+
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.datagen import WORDS, rank
+from posts.models import Follow, Group, Post, User
+
+PROFILED_REQUESTS = 5
+FEED_DEPTH = 20
+NEXT_LINK = re.compile(r'cursor=([\w-]+)">\s*Следующая')
+PERCENTILES = (50, 95, 99)
+# Адреса, которые без входа отвечают редиректом на страницу входа.
+LOGIN_REQUIRED = {'post_create', 'post_edit', 'add_comment', 'follow_index',
+                  'profile_follow', 'profile_unfollow'}
+
+
+class Dataset:
+    """Что лежит в базе: к каким постам, авторам и группам ходить."""
+
+    def __init__(self, guest=False):
+        self.post_ids = list(
+            Post.objects.order_by('id').values_list('id', flat=True))
+        self.usernames = list(
+            User.objects.order_by('id').values_list('username', flat=True))
+        self.slugs = list(
+            Group.objects.order_by('id').values_list('slug', flat=True))
+        # Читатель — самый активный подписчик: его лента тяжелее всех.
+        reader_id = Follow.objects.values('user').annotate(
+            n=Count('id')).order_by('-n').values_list('user', flat=True)[0]
+        self.reader = User.objects.get(pk=reader_id)
+        self.own_post_ids = list(Post.objects.filter(
+            author=self.reader).values_list('id', flat=True)[:1000])
+        if not self.own_post_ids:
+            self.own_post_ids = [Post.objects.create(
+                author=self.reader, text='Пост читателя').id]
+        self.member = Client()
+        self.member.force_login(self.reader)
+        self.guest = Client() if guest else self.member
+        # Адрес ленты → курсоры её страниц по порядку; None — дальше
+        # страниц нет.
+        self.cursors = {}
+
+    def post(self, rnd):
+        # Свежие посты читают чаще старых.
+        return self.post_ids[-1 - rank(rnd, len(self.post_ids))]
+
+    def username(self, rnd):
+        return self.usernames[rank(rnd, len(self.usernames))]
+
+    def slug(self, rnd):
+        return self.slugs[rank(rnd, len(self.slugs))]
+
+    def page(self, url, rnd):
+        """Параметры страницы ленты url, до которой долистал читатель.
+
+        Курсоры берутся из ссылок «Следующая» один раз на адрес.
+        """
+        depth = rank(rnd, FEED_DEPTH)
+        cursors = self.cursors.setdefault(url, [''])
+        while len(cursors) <= depth and cursors[-1] is not None:
+            params = {'cursor': cursors[-1]} if cursors[-1] else {}
+            found = NEXT_LINK.search(
+                self.member.get(url, params).content.decode())
+            cursors.append(found.group(1) if found else None)
+        cursor = [
+            cursor for cursor in cursors[:depth + 1] if cursor is not None
+        ][-1]
+        return {'cursor': cursor} if cursor else {}
+
+
+def _feed(name, *args):
+    """Цель для ленты: args — методы Dataset для аргументов адреса."""
+    def target(data, rnd):
+        url = reverse(f'posts:{name}', args=[arg(data, rnd) for arg in args])
+        return 'get', url, data.page(url, rnd)
+    return target
+
+
+# Имя адреса → (метод, адрес, данные) для очередного запроса.
+TARGETS = {
+    'index': _feed('index'),
+    'group_list': _feed('group_list', Dataset.slug),
+    'profile': _feed('profile', Dataset.username),
+    'search': lambda data, rnd: (
+        'get', reverse('posts:search'), {'q': rnd.choice(WORDS)}),
+    'post_detail': lambda data, rnd: (
+        'get', reverse('posts:post_detail', args=[data.post(rnd)]), {}),
+    'post_create': lambda data, rnd: (
+        'get', reverse('posts:post_create'), {}),
+    'post_edit': lambda data, rnd: (
+        'get', reverse('posts:post_edit',
+                       args=[rnd.choice(data.own_post_ids)]), {}),
+    'comments': lambda data, rnd: (
+        'get', reverse('posts:comments', args=[data.post(rnd)]), {}),
+    'add_comment': lambda data, rnd: (
+        'post', reverse('posts:add_comment', args=[data.post(rnd)]),
+        {'text': 'Комментарий из бенчмарка'}),
+    'follow_index': _feed('follow_index'),
+    'profile_follow': lambda data, rnd: (
+        'get', reverse('posts:profile_follow', args=[data.username(rnd)]),
+        {}),
+    'profile_unfollow': lambda data, rnd: (
+        'get', reverse('posts:profile_unfollow', args=[data.username(rnd)]),
+        {}),
+}
+
+
+def percentile(values, percent):
+    """Значение, не больше которого percent процентов values."""
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[index]
+
+
+def _call(data, name, request):
+    method, url, params = request
+    client = data.member if name in LOGIN_REQUIRED else data.guest
+    response = getattr(client, method)(url, params)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: ответ {response.status_code}')
+
+
+def measure(data, name, requests, seed=1, clear=None):
+    """Перцентили задержки (мс), запросы к базе и пик памяти (КБ).
+
+    clear() вызывается перед каждым запросом — для прогона с холодным
+    кэшем.
+    """
+    rnd = random.Random(f'{seed}:{name}')
+    calls = [TARGETS[name](data, rnd) for _ in range(requests)]
+    timings = []
+    for request in calls:
+        if clear:
+            clear()
+        started = time.perf_counter()
+        _call(data, name, request)
+        timings.append((time.perf_counter() - started) * 1000)
+    queries, peaks = [], []
+    for request in calls[:PROFILED_REQUESTS]:
+        if clear:
+            clear()
+        with CaptureQueriesContext(connection) as captured:
+            tracemalloc.start()
+            try:
+                _call(data, name, request)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            finally:
+                tracemalloc.stop()
+        queries.append(len(captured))
+    result = {
+        f'p{percent}': round(percentile(timings, percent), 2)
+        for percent in PERCENTILES
+    }
+    result['queries'] = max(queries)
+    result['alloc_kb'] = round(percentile(peaks, 50))
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии results относительно baseline одного размера.
+
+    Запросов к базе не должно стать больше вовсе; p95 и память могут
+    вырасти не более чем в 1 + tolerance раз — машины и прогоны разные.
+    """
+    problems = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['queries'] > before['queries']:
+            problems.append(
+                f'{name}: запросов {before["queries"]} → '
+                f'{current["queries"]}')
+        for metric in ('p95', 'alloc_kb'):
+            if current[metric] > before[metric] * (1 + tolerance):
+                problems.append(
+                    f'{name}: {metric} {before[metric]} → {current[metric]}')
+    return problems
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.object_cache import shared_timeout
+from posts import feed_cache
+
+CARD_TEMPLATE = 'includes/page_ind.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def _key(post_id):
+    return f'post_card:{post_id}'
+
+
+def render_cards(posts):
+    """HTML карточек страницы: один get_many, рендер только промахов.
+
+    Карточка хранится вместе с поколениями групп и автора: в ней ссылка
+    на группу по slug, имя автора и ссылка на профиль по username.
+    """
+    posts = list(posts)
+    found = feed_cache.version_map(
+        'groups', *{f'user:{post.author_id}' for post in posts})
+    cached = cache.get_many([_key(post.id) for post in posts])
+    cards, missing = [], {}
+    for post in posts:
+        version = (found['groups'], found[f'user:{post.author_id}'])
+        entry = cached.get(_key(post.id))
+        if entry is not None and entry[:2] == version:
+            html = entry[2]
+        else:
+            html = render_to_string(CARD_TEMPLATE, {'post': post})
+            missing[_key(post.id)] = (*version, html)
+        cards.append(mark_safe(html))
+    if missing:
+        cache.set_many(missing, shared_timeout(CARD_TIMEOUT))
+    return cards
+
+
+def invalidate(post_id):
+    cache.delete(_key(post_id))
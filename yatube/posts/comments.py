@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.object_cache import shared_timeout
+from posts.models import Comment
+from posts.paginator import NEXT, QuerySetSource, decode_cursor, encode_cursor
+
+COMMENTS_PER_PAGE = 20
+COMMENTS_TEMPLATE = 'includes/comments.html'
+COMMENTS_TIMEOUT = 60 * 60 * 24
+
+
+def _key(post_id):
+    return f'comments:first:{post_id}'
+
+
+def _render(post_id, key):
+    source = QuerySetSource(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        fields=('created', 'id'),
+    )
+    rows = source.fetch(key, NEXT, COMMENTS_PER_PAGE + 1)
+    comments = rows[:COMMENTS_PER_PAGE]
+    next_cursor = None
+    if len(rows) > COMMENTS_PER_PAGE:
+        next_cursor = encode_cursor(source.key(comments[-1]), NEXT)
+    return {
+        'html': render_to_string(COMMENTS_TEMPLATE, {'comments': comments}),
+        'next': next_cursor,
+    }
+
+
+def comment_page(post_id, cursor=None):
+    """HTML страницы комментариев от новых к старым и курсор следующей.
+
+    Кэшируется только первая страница: новый комментарий попадает
+    в неё, а страницы за курсором от него не меняются.
+    """
+    key, _ = decode_cursor(cursor)
+    if key is not None:
+        return _render(post_id, key)
+    page = cache.get(_key(post_id))
+    if page is None:
+        page = _render(post_id, None)
+        cache.set(_key(post_id), page, shared_timeout(COMMENTS_TIMEOUT))
+    return page
+
+
+def invalidate(post_id):
+    cache.delete(_key(post_id))
+
+
+def invalidate_many(post_ids):
+    cache.delete_many([_key(post_id) for post_id in post_ids])
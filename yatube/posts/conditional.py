@@ -0,0 +1,104 @@
+"""Условные GET и кэш страниц для лент и страницы поста.
+
+ETag и Last-Modified считаются по поколениям из feed_cache, без
+рендера шаблона: если клиент прислал актуальный ETag, ответ — 304.
+В ETag входит и секрет CSRF: после входа он меняется, и страница с
+формой не должна отдаваться из кэша браузера с устаревшим токеном.
+Те же поколения входят в ключ кэша целых страниц для анонимов.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from core.page_cache import cache_anonymous
+from posts import feed_cache, lookups
+
+
+def _viewer_scopes(request):
+    # Шапка и кнопка подписки зависят от того, кто смотрит.
+    if request.user.is_authenticated:
+        return [f'follow:{request.user.pk}']
+    return []
+
+
+def index_scopes(request):
+    return ['posts', 'groups']
+
+
+def group_scopes(request, slug):
+    group = lookups.groups.get(slug)
+    if group is None:
+        return None
+    return [f'group:{group.id}', 'groups']
+
+
+def profile_scopes(request, username):
+    author = lookups.users.get(username)
+    if author is None:
+        return None
+    return [f'author:{author.id}', f'profile:{author.id}', 'groups',
+            *_viewer_scopes(request)]
+
+
+def post_scopes(request, post_id):
+    post = lookups.post_authors.get(post_id)
+    if post is None:
+        return None
+    # profile: — счётчики автора в карточке рядом с постом.
+    return [f'post:{post_id}', f'author:{post.author_id}',
+            f'profile:{post.author_id}', 'groups']
+
+
+def search_scopes(request):
+    return ['posts']
+
+
+def comments_scopes(request, post_id):
+    return [f'post:{post_id}']
+
+
+def page_version(scopes_func):
+    """Версия страницы для core.page_cache по поколениям scopes_func."""
+    def version(request, *args, **kwargs):
+        found = scopes_func(request, *args, **kwargs)
+        if found is None:
+            return None
+        return feed_cache.versions(*found)
+    return version
+
+
+def feed_condition(scopes_func):
+    """condition() по поколениям, которые возвращает scopes_func.
+
+    None вместо списка — страницы нет, заголовки не ставятся.
+    """
+    def scopes(request, *args, **kwargs):
+        if not hasattr(request, '_feed_scopes'):
+            request._feed_scopes = scopes_func(request, *args, **kwargs)
+        return request._feed_scopes
+
+    def etag(request, *args, **kwargs):
+        found = scopes(request, *args, **kwargs)
+        if found is None:
+            return None
+        raw = '|'.join([
+            feed_cache.versions(*found),
+            str(request.user.pk),
+            # Секрет, который CsrfViewMiddleware прочитал из cookie.
+            request.META.get('CSRF_COOKIE', ''),
+            request.GET.urlencode(),
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # Дата не знает, кто смотрит, поэтому вошедшим — только ETag.
+        found = scopes(request, *args, **kwargs)
+        if found is None or request.user.is_authenticated:
+            return None
+        return feed_cache.last_modified(*found)
+
+    def decorator(view):
+        view = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+        return cache_anonymous(page_version(scopes))(view)
+    return decorator
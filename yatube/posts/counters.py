@@ -0,0 +1,122 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import Follow, Group, GroupStats, Post, User, UserStats
+
+BATCH_SIZE = 500
+USER_COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+
+def _count(model, field):
+    """Подзапрос COUNT(*) строк model, ссылающихся на текущую строку."""
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _user_counts():
+    return User.objects.annotate(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def _group_counts():
+    return Group.objects.annotate(posts_count=_count(Post, 'group'))
+
+
+def _change(model, pk, recount=None, **deltas):
+    """Атомарно сдвигает счётчики строки; пропавшую строку пересчитывает.
+
+    Без recount пропавшая строка остаётся пропавшей: её восстановят
+    user_stats() или reconcile().
+    """
+    if pk is None:
+        return
+    updated = model.objects.filter(pk=pk).update(**{
+        name: Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+    if not updated and recount is not None:
+        recount(pk)
+
+
+def recount_user(user_id):
+    counts = _user_counts().filter(pk=user_id).values(*USER_COUNTERS).first()
+    if counts is not None:
+        UserStats.objects.update_or_create(user_id=user_id, defaults=counts)
+
+
+def recount_group(group_id):
+    counts = _group_counts().filter(pk=group_id).values('posts_count').first()
+    if counts is not None:
+        GroupStats.objects.update_or_create(group_id=group_id, defaults=counts)
+
+
+def post_added(post):
+    _change(UserStats, post.author_id, recount_user, posts_count=1)
+    _change(GroupStats, post.group_id, recount_group, posts_count=1)
+
+
+# Удаления не пересчитывают пропавшие строки: при каскадном удалении
+# пользователя или группы строка счётчиков удаляется раньше постов и
+# подписок, и пересчёт создал бы её заново для удаляемого владельца.
+def post_removed(post):
+    _change(UserStats, post.author_id, posts_count=-1)
+    _change(GroupStats, post.group_id, posts_count=-1)
+
+
+def post_moved(post, previous_group_id, previous_author_id=None):
+    if previous_group_id != post.group_id:
+        _change(GroupStats, previous_group_id, recount_group, posts_count=-1)
+        _change(GroupStats, post.group_id, recount_group, posts_count=1)
+    if previous_author_id not in (None, post.author_id):
+        _change(UserStats, previous_author_id, recount_user, posts_count=-1)
+        _change(UserStats, post.author_id, recount_user, posts_count=1)
+
+
+def follow_added(follow):
+    _change(UserStats, follow.author_id, recount_user, followers_count=1)
+    _change(UserStats, follow.user_id, recount_user, following_count=1)
+
+
+def follow_removed(follow):
+    _change(UserStats, follow.author_id, followers_count=-1)
+    _change(UserStats, follow.user_id, following_count=-1)
+
+
+def user_stats(user):
+    """Счётчики пользователя; отсутствующая строка создаётся пересчётом."""
+    stats = UserStats.objects.filter(user_id=user.pk).first()
+    if stats is None:
+        recount_user(user.pk)
+        stats = UserStats.objects.get(user_id=user.pk)
+    return stats
+
+
+def _reconcile(queryset, model, key, fields):
+    stored = {
+        row[0]: row[1:]
+        for row in model.objects.values_list(key, *fields).iterator()
+    }
+    stale, missing = [], []
+    for row in queryset.values_list('pk', *fields).iterator():
+        pk, counts = row[0], row[1:]
+        if pk not in stored:
+            missing.append(model(pk=pk, **dict(zip(fields, counts))))
+        elif stored[pk] != counts:
+            stale.append(model(pk=pk, **dict(zip(fields, counts))))
+    model.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+    model.objects.bulk_update(stale, fields, batch_size=BATCH_SIZE)
+    return len(missing) + len(stale)
+
+
+def reconcile():
+    """Пересчитывает все счётчики с нуля; возвращает число исправлений."""
+    return (
+        _reconcile(_user_counts(), UserStats, 'user_id', USER_COUNTERS)
+        + _reconcile(_group_counts(), GroupStats, 'group_id',
+                     ('posts_count',))
+    )
@@ -0,0 +1,265 @@
+"""Детерминированный генератор данных для бенчмарков и стендов.
+
+Одни и те же Spec дают одни и те же строки. Активность авторов и
+число подписчиков распределены по степенному закону, но независимо
+друг от друга: самые плодовитые авторы — не обязательно самые
+популярные.
+
+Строки пишутся пачками через многострочные INSERT
+(posts.ingest.bulk_insert), без сигналов; производные данные
+(счётчики, ленты подписок, поиск) строятся одним проходом в конце, как
+при импорте в posts.ingest.
+"""
+import io
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from PIL import Image
+
+from core import object_cache
+from posts import counters, search, thumbnails, timeline
+from posts.ingest import bulk_insert
+from posts.models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 10000
+DRAWS = 20
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+# Картинки повторяются: на все посты хватает небольшого набора файлов.
+IMAGES = 50
+WORDS = (
+    'кот собака город книга утро вечер дорога лес море дом друг '
+    'работа праздник погода новость фото прогулка чай музыка кино '
+    'сегодня вчера снова очень просто красивый новый старый большой '
+    'и в на не что это как по но из за мы они все был уже тут там'
+).split()
+
+
+class Spec:
+    """Размеры набора и параметры распределений.
+
+    Не заданные явно размеры выводятся из числа постов. comments и
+    follows — средние на пост и на пользователя, images и grouped —
+    доли постов с картинкой и с группой, skew — показатель степенного
+    закона (1 — закон Ципфа).
+    """
+
+    def __init__(self, posts, users=None, groups=None, comments=1.0,
+                 follows=10.0, images=0.2, grouped=0.7, skew=1.0,
+                 days=3 * 365, seed=1, prefix='user'):
+        self.posts = posts
+        self.users = users or max(posts // 20, 50)
+        self.groups = groups or max(posts // 2000, 5)
+        self.comments = comments
+        self.follows = follows
+        self.images = images
+        self.grouped = grouped
+        self.skew = skew
+        self.days = days
+        self.seed = seed
+        self.prefix = prefix
+
+
+def rank(rnd, total, skew=1.0):
+    """Номер от 0 до total - 1 с плотностью ~1/r**skew."""
+    if skew == 1:
+        # total ** random() — как раз плотность 1/r, и без степеней.
+        return min(int(total ** rnd.random()) - 1, total - 1)
+    low, high = 1, total ** (1 - skew)
+    value = (low + (high - low) * rnd.random()) ** (1 / (1 - skew))
+    return min(int(value) - 1, total - 1)
+
+
+def amount(rnd, mean):
+    """Целое >= 0 с геометрическим распределением и средним mean.
+
+    Целая часть показательной величины с интенсивностью ln(1 + 1/mean)
+    распределена геометрически как раз с таким средним.
+    """
+    if mean <= 0:
+        return 0
+    return int(rnd.expovariate(math.log1p(1 / mean)))
+
+
+def _text(rnd, low, high):
+    return ' '.join(
+        rnd.choice(WORDS) for _ in range(rnd.randint(low, high))
+    ).capitalize()
+
+
+def _thumbnails(image):
+    name = image.rsplit('/', 1)[-1]
+    return json.dumps({
+        size: f'{settings.MEDIA_URL}cache/synthetic/{size}/{name}'
+        for size in thumbnails.SIZES
+    })
+
+
+def users(spec, password=None):
+    # Хэш дорогой, поэтому один на всех; '!' — войти нельзя.
+    hashed = make_password(password) if password else '!'
+    for number in range(spec.users):
+        yield User(
+            username=f'{spec.prefix}{number}',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+            password=hashed,
+        )
+
+
+def groups(spec):
+    for number in range(spec.groups):
+        yield Group(
+            title=f'Группа {number}',
+            slug=f'{spec.prefix}-group-{number}',
+            description=f'Описание группы {number}',
+        )
+
+
+def follows(spec, rnd, user_ids):
+    total = len(user_ids)
+    popular = list(user_ids)
+    rnd.shuffle(popular)
+    for user_id in user_ids:
+        wanted = min(amount(rnd, spec.follows), total - 1)
+        # Повторы и подписка на себя не в счёт, иначе среднее ниже.
+        # Попыток не больше DRAWS на подписку: в маленьком наборе
+        # редких авторов можно ждать долго.
+        authors = set()
+        for _ in range(wanted * DRAWS):
+            if len(authors) == wanted:
+                break
+            author_id = popular[rank(rnd, total, spec.skew)]
+            if author_id != user_id:
+                authors.add(author_id)
+        for author_id in sorted(authors):
+            yield Follow(user_id=user_id, author_id=author_id)
+
+
+def posts(spec, rnd, user_ids, group_ids):
+    step = timedelta(days=spec.days) / max(spec.posts, 1)
+    for number in range(spec.posts):
+        post = Post(
+            text=_text(rnd, 5, 40),
+            author_id=user_ids[rank(rnd, len(user_ids), spec.skew)],
+            pub_date=START + step * number,
+        )
+        if rnd.random() < spec.grouped:
+            post.group_id = rnd.choice(group_ids)
+        if rnd.random() < spec.images:
+            post.image = _image_name(number)
+            post.thumbnails = _thumbnails(post.image.name)
+        yield post
+
+
+def comments(spec, rnd, post_rows, user_ids):
+    for post_id, pub_date in post_rows:
+        for minute in range(amount(rnd, spec.comments)):
+            yield Comment(
+                post_id=post_id,
+                author_id=rnd.choice(user_ids),
+                text=_text(rnd, 2, 15),
+                created=pub_date + timedelta(minutes=minute + 1),
+            )
+
+
+def _write(model, rows, log, chunk_size):
+    """Пишет строки пачками, по транзакции на пачку."""
+    total, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            total += _flush(model, chunk)
+            chunk = []
+            log(f'{model._meta.verbose_name_plural}: {total}')
+    return total + _flush(model, chunk)
+
+
+def _flush(model, chunk):
+    with transaction.atomic():
+        bulk_insert(model, chunk)
+    return len(chunk)
+
+
+def _last_id(model):
+    return model.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _image_name(number):
+    return f'posts/synthetic/{number % IMAGES}.jpg'
+
+
+def write_images():
+    """Кладёт в хранилище картинки, на которые ссылаются посты."""
+    for number in range(IMAGES):
+        name = _image_name(number)
+        if default_storage.exists(name):
+            continue
+        rnd = random.Random(number)
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 424), color).save(buffer, 'JPEG')
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def attach_thumbnails(posts):
+    """Нарезает каждую картинку один раз и раздаёт адреса всем постам."""
+    for number in range(IMAGES):
+        same = posts.filter(image=_image_name(number))
+        post = same.first()
+        if post is not None:
+            thumbnails.generate(post)
+            same.update(thumbnails=post.thumbnails)
+
+
+def load(spec, log=lambda message: None, chunk_size=CHUNK_SIZE,
+         password=None, image_files=False):
+    """Создаёт набор данных по spec; возвращает число строк по моделям.
+
+    chunk_size — строк на транзакцию. password — общий пароль
+    пользователей (по умолчанию войти нельзя). image_files — положить
+    картинки в хранилище и нарезать их, иначе у постов только адреса.
+    """
+    rnd = random.Random(spec.seed)
+    first = {model: _last_id(model) for model in (User, Group, Post)}
+
+    def new_rows(model):
+        return model.objects.filter(id__gt=first[model]).order_by('id')
+
+    def write(model, rows):
+        return _write(model, rows, log, chunk_size)
+
+    written = {User: write(User, users(spec, password))}
+    written[Group] = write(Group, groups(spec))
+    user_ids = list(new_rows(User).values_list('id', flat=True))
+    group_ids = list(new_rows(Group).values_list('id', flat=True))
+    written[Follow] = write(Follow, follows(spec, rnd, user_ids))
+    written[Post] = write(Post, posts(spec, rnd, user_ids, group_ids))
+    post_rows = new_rows(Post).values_list('id', 'pub_date')
+    written[Comment] = write(Comment, comments(
+        spec, rnd, post_rows.iterator(chunk_size), user_ids))
+    if image_files:
+        log('Картинки')
+        write_images()
+        attach_thumbnails(new_rows(Post))
+    log('Счётчики')
+    counters.reconcile()
+    log('Ленты подписок')
+    with transaction.atomic():
+        timeline.fan_out_since(first[Post])
+    log('Поисковый индекс')
+    with transaction.atomic():
+        search.index_posts(new_rows(Post).values_list(
+            'id', 'text').iterator(chunk_size))
+    # Поколения и объекты в кэше описывают базу до загрузки.
+    cache.clear()
+    object_cache.clear_local()
+    return {model.__name__: count for model, count in written.items()}
@@ -0,0 +1,90 @@
+import random
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from core.object_cache import shared_timeout
+
+# Фрагменты лент хранятся бессрочно: ключ включает номера поколений,
+# которые сигналы Post и Group сдвигают при каждом изменении. Бессрочно
+# только в общем кэше: с кэшем процесса срок ограничивает
+# shared_timeout(), иначе сдвиг в одном воркере не дойдёт до других.
+FRAGMENT_TIMEOUT = None
+
+
+def _key(scope):
+    return f'feed_version:{scope}'
+
+
+def _modified_key(scope):
+    return f'feed_modified:{scope}'
+
+
+def _seed():
+    # Пропавший из кэша счётчик заводится со случайного значения, чтобы
+    # не совпасть с поколением, под которым лежат старые фрагменты.
+    return random.randrange(1, 2 ** 62)
+
+
+def version_map(*scopes):
+    """Поколения по отдельности: {scope: номер}."""
+    keys = {scope: _key(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in found:
+            cache.add(key, _seed(), shared_timeout(FRAGMENT_TIMEOUT))
+            found[key] = cache.get(key)
+    return {scope: found[key] for scope, key in keys.items()}
+
+
+def versions(*scopes):
+    """Строка поколений для ключа фрагмента ленты."""
+    found = version_map(*scopes)
+    return '.'.join(str(found[scope]) for scope in scopes)
+
+
+def bump(*scopes):
+    """Сдвигает поколения: фрагменты со старыми ключами больше не читаются."""
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), _seed(), shared_timeout(FRAGMENT_TIMEOUT))
+    now = time.time()
+    cache.set_many(
+        {_modified_key(scope): now for scope in scopes},
+        shared_timeout(FRAGMENT_TIMEOUT))
+
+
+def last_modified(*scopes):
+    """Время последнего сдвига поколений.
+
+    Пропавшая из кэша отметка считается текущим моментом: так клиент
+    с более старой датой получит страницу целиком.
+    """
+    keys = [_modified_key(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, time.time(), shared_timeout(FRAGMENT_TIMEOUT))
+            stamps[key] = cache.get(key)
+    return datetime.fromtimestamp(max(stamps.values()), timezone.utc)
+
+
+def post_scopes(post, followers=()):
+    """Ленты, в которых виден пост."""
+    scopes = ['posts', f'post:{post.id}']
+    author_ids = {post.author_id, getattr(post, '_previous_author_id', None)}
+    scopes += [f'author:{author_id}' for author_id in author_ids if author_id]
+    group_ids = {post.group_id, getattr(post, '_previous_group_id', None)}
+    scopes += [f'group:{group_id}' for group_id in group_ids if group_id]
+    scopes += [f'follow:{user_id}' for user_id in followers]
+    return scopes
+
+
+def follow_scopes(user_id, celebrities=()):
+    """Лента подписок: своя версия плюс версии авторов-«звёзд»."""
+    scopes = [f'follow:{user_id}', 'groups']
+    scopes += [f'author:{author_id}' for author_id in celebrities]
+    return scopes
@@ -0,0 +1,301 @@
+"""Массовый импорт постов и комментариев из NDJSON или CSV.
+
+Записи читаются потоком и идут пачками по CHUNK_SIZE: ссылки на
+авторов, группы и посты разрешаются одним запросом на пачку, текст
+проверяется правилами полей PostForm и CommentForm, а строки пачки
+вставляются одной транзакцией. Сигналы при этом не срабатывают:
+счётчики, ленты подписок, поисковый индекс и поколения кэша
+обновляются одним проходом после всех пачек.
+
+Поля постов: author (username), text, group (slug, необязательно),
+pub_date (ISO 8601, необязательно). Поля комментариев: post (id),
+author, text, created.
+"""
+import csv
+import json
+from itertools import islice
+
+from django import forms
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import comments, counters, feed_cache, search, timeline
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Group, Post, User
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 100
+FORMATS = ('ndjson', 'csv')
+PREPARED_TYPES = ('DateField', 'DateTimeField', 'FileField')
+
+
+def read(lines, format):
+    """Пары (номер строки, запись) из итератора строк.
+
+    Строка, которая не разбирается, даёт вместо записи ValueError.
+    """
+    if format == 'csv':
+        yield from _read_csv(lines)
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield number, ValueError(f'Не JSON: {error}')
+            continue
+        if not isinstance(record, dict):
+            record = ValueError('Ожидается объект JSON.')
+        yield number, record
+
+
+def _read_csv(lines):
+    reader = csv.DictReader(lines)
+    try:
+        # Заголовок читается при первом обращении к fieldnames.
+        reader.fieldnames
+    except csv.Error as error:
+        yield 1, ValueError(f'Не CSV: {error}')
+        return
+    while True:
+        start = reader.line_num + 1
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            # Читатель уже прошёл битую строку, но line_num не сдвинул.
+            yield start, ValueError(f'Не CSV: {error}')
+            continue
+        yield reader.line_num, record
+
+
+def _date(raw):
+    """Дата записи; пустая — текущий момент."""
+    if not raw:
+        return timezone.now()
+    try:
+        date = parse_datetime(str(raw))
+    except ValueError:
+        # Формат верный, но значения вне диапазона: 13-й месяц и т. п.
+        raise forms.ValidationError('Такой даты не бывает.')
+    if date is None:
+        raise forms.ValidationError('Дата не в формате ISO 8601.')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def bulk_insert(model, objs):
+    """Вставляет объекты многострочными INSERT вместо bulk_create().
+
+    bulk_create() ставит полям auto_now_add текущее время, а при
+    переносе нужны даты со старой платформы. executemany() не годится:
+    SQL-панель debug toolbar в режиме DEBUG на нём падает.
+    """
+    ops = connection.ops
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    sql = 'INSERT INTO {} ({}) VALUES '.format(
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+    )
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    # Числа и строки уже годятся для базы, приводить надо только даты
+    # и файлы.
+    prepare = [
+        field.get_db_prep_save
+        if field.get_internal_type() in PREPARED_TYPES else None
+        for field in fields
+    ]
+    rows = [
+        tuple(
+            getattr(obj, field.attname) if convert is None
+            else convert(getattr(obj, field.attname), connection)
+            for field, convert in zip(fields, prepare)
+        )
+        for obj in objs
+    ]
+    batch_size = max(ops.bulk_batch_size(fields, rows), 1)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                sql + ', '.join([placeholders] * len(batch)),
+                [value for row in batch for value in row])
+
+
+class Importer:
+    """Общая часть импорта: пачки, ошибки и проход после вставки."""
+
+    model = None
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+        self.first_id = None
+
+    def run(self, records):
+        records = iter(records)
+        self.first_id = self.model.objects.aggregate(
+            last=Max('id'))['last'] or 0
+        try:
+            while True:
+                chunk = list(islice(records, CHUNK_SIZE))
+                if not chunk:
+                    break
+                self.load(chunk)
+        finally:
+            # Уже вставленные пачки доводим, даже если поток оборвался.
+            if self.created:
+                self.finish()
+        return self
+
+    def error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': number, 'error': message})
+
+    def load(self, chunk):
+        refs = self.resolve([
+            record for _, record in chunk if isinstance(record, dict)])
+        objs = []
+        for number, record in chunk:
+            if isinstance(record, Exception):
+                self.error(number, str(record))
+                continue
+            try:
+                objs.append(self.build(record, refs))
+            except forms.ValidationError as error:
+                self.error(number, ' '.join(error.messages))
+        if objs:
+            with transaction.atomic():
+                bulk_insert(self.model, objs)
+            self.created += len(objs)
+
+    def new_rows(self):
+        """Строки, появившиеся после начала импорта.
+
+        Сюда попадут и строки, добавленные параллельно обычным путём:
+        проход после импорта для них просто повторится.
+        """
+        return self.model.objects.filter(id__gt=self.first_id).order_by()
+
+    @staticmethod
+    def _text(form, record):
+        return form.base_fields['text'].clean(record.get('text'))
+
+    @staticmethod
+    def _ids(model, field, values):
+        values = {value for value in values if isinstance(value, str)}
+        return dict(model.objects.filter(
+            **{f'{field}__in': values}).values_list(field, 'id'))
+
+    @staticmethod
+    def _ref(ids, value):
+        return ids.get(value) if isinstance(value, str) else None
+
+    def _author(self, record, refs):
+        author_id = self._ref(refs['users'], record.get('author'))
+        if author_id is None:
+            raise forms.ValidationError('Нет автора с таким username.')
+        return author_id
+
+
+class PostImporter(Importer):
+    model = Post
+
+    def resolve(self, records):
+        return {
+            'users': self._ids(
+                User, 'username', [r.get('author') for r in records]),
+            'groups': self._ids(
+                Group, 'slug', [r.get('group') for r in records]),
+        }
+
+    def build(self, record, refs):
+        text = self._text(PostForm, record)
+        author_id = self._author(record, refs)
+        group_id = None
+        if record.get('group'):
+            group_id = self._ref(refs['groups'], record['group'])
+            if group_id is None:
+                raise forms.ValidationError('Нет группы с таким slug.')
+        return Post(text=text, author_id=author_id, group_id=group_id,
+                    pub_date=_date(record.get('pub_date')))
+
+    def finish(self):
+        rows = self.new_rows()
+        authors = set(rows.values_list('author_id', flat=True).distinct())
+        groups = set(rows.exclude(group=None).values_list(
+            'group_id', flat=True).distinct())
+        for author_id in authors:
+            counters.recount_user(author_id)
+        for group_id in groups:
+            counters.recount_group(group_id)
+        followers = timeline.fan_out_many(rows.values_list(
+            'id', 'author_id', 'pub_date').iterator())
+        search.index_posts(rows.values_list('id', 'text').iterator())
+        # Открытые страницы импортированных постов отдельно не сдвигаем:
+        # их id до импорта никто не видел.
+        feed_cache.bump(
+            'posts',
+            *[f'author:{author_id}' for author_id in authors],
+            *[f'profile:{author_id}' for author_id in authors],
+            *[f'group:{group_id}' for group_id in groups],
+            *[f'follow:{user_id}' for user_id in followers],
+        )
+
+
+class CommentImporter(Importer):
+    model = Comment
+
+    def resolve(self, records):
+        post_ids = []
+        for record in records:
+            try:
+                post_ids.append(int(record.get('post')))
+            except (TypeError, ValueError):
+                pass
+        return {
+            'users': self._ids(
+                User, 'username', [r.get('author') for r in records]),
+            'posts': set(Post.objects.filter(
+                id__in=set(post_ids)).values_list('id', flat=True)),
+        }
+
+    def build(self, record, refs):
+        text = self._text(CommentForm, record)
+        author_id = self._author(record, refs)
+        try:
+            post_id = int(record.get('post'))
+        except (TypeError, ValueError):
+            post_id = None
+        if post_id not in refs['posts']:
+            raise forms.ValidationError('Нет поста с таким id.')
+        return Comment(text=text, author_id=author_id, post_id=post_id,
+                       created=_date(record.get('created')))
+
+    def finish(self):
+        post_ids = set(self.new_rows().exclude(post=None).values_list(
+            'post_id', flat=True).distinct())
+        for post_id in post_ids:
+            comments.invalidate(post_id)
+        feed_cache.bump(*[f'post:{post_id}' for post_id in post_ids])
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'comments': CommentImporter,
+}
+
+
+def ingest(kind, lines, format):
+    """Импортирует записи вида kind ('posts' или 'comments')."""
+    return IMPORTERS[kind]().run(read(lines, format))
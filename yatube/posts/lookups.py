@@ -0,0 +1,13 @@
+from core.object_cache import ObjectCache
+from posts.models import Group, Post, User
+
+# Группа по slug и автор по username почти не меняются, а читаются
+# на каждой ленте и профиле. Кэши чистят сигналы Group и User.
+groups = ObjectCache(Group.objects.all(), 'slug')
+users = ObjectCache(
+    User.objects.only('id', 'username', 'first_name', 'last_name'),
+    'username',
+)
+# Автор поста нужен условному GET страницы поста; при смене автора
+# запись сбрасывает сигнал сохранения поста.
+post_authors = ObjectCache(Post.objects.only('id', 'author_id'), 'pk')
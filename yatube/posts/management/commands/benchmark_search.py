@@ -0,0 +1,175 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from posts import search
+from posts.ingest import bulk_insert
+from posts.models import Post
+from posts.search import SEARCH_LIMIT, fts
+
+CHUNK = 10000
+
+STEMS = [
+    ('кот', ('', 'а', 'у', 'ом', 'ы', 'ов', 'ами', 'ах')),
+    ('книг', ('а', 'и', 'е', 'у', 'ой', 'ам', 'ами')),
+    ('город', ('', 'а', 'у', 'ом', 'е', 'ов', 'ами')),
+    ('подпис', ('ка', 'ки', 'ку', 'кой', 'ался', 'аться', 'чик')),
+    ('красив', ('ый', 'ая', 'ое', 'ые', 'ого', 'ой', 'ейший')),
+    ('писа', ('л', 'ла', 'ли', 'ть', 'вший', 'вшие')),
+    ('ёлк', ('а', 'и', 'е', 'у', 'ой')),
+    ('сообществ', ('о', 'а', 'у', 'ом', 'е')),
+    ('дорог', ('а', 'и', 'е', 'у', 'ой', 'ами')),
+    ('утр', ('о', 'а', 'ом', 'ам')),
+]
+FILLER = (
+    'и в на не что это как по но из за мы вы они все было был уже '
+    'сегодня вчера очень просто снова тоже тут там где когда '
+    'post day cat cats running played city books morning'
+).split()
+SYLLABLES = 'ба ве ги до жу за ки ло му на по ре си ту фа хо це чу ша'.split()
+NOUN_ENDINGS = ('', 'а', 'у', 'ом', 'е', 'ы', 'ов', 'ами', 'ах')
+# Редкие слова из синтетического словаря выбираются по закону Ципфа,
+# чтобы термы были такими же избирательными, как в живом тексте.
+VOCABULARY = 20000
+QUERIES = ('кот', 'котами', 'Книгой', 'подписаться', 'елка', 'красивые',
+           'сообществом', 'cats', 'кот утро')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск через icontains с posts.search.search() на '
+        'индексах FTS5 и PostTerm. Корпус генерируется в отдельной базе '
+        'SQLite; меряется тот же код, что работает в поиске на сайте.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--path',
+            help='Файл базы, чтобы не генерировать корпус заново; по '
+                 'умолчанию временный.')
+
+    def handle(self, *args, **options):
+        directory = None
+        path = options['path']
+        if not path:
+            directory = tempfile.mkdtemp()
+            path = os.path.join(directory, 'search_benchmark.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+        keep = bool(options['path'])
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+        self.stdout.write(f'База: {path}')
+        try:
+            # Без DEBUG соединение не копит тексты запросов.
+            with override_settings(DEBUG=False):
+                self.run(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=keep)
+            if directory:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, options):
+        sizes = {}
+        if not Post.objects.exists():
+            sizes['posts'] = self.pages(
+                self.load, options['posts'], options['seed'])
+        backends = ['inverted'] + (['fts'] if fts.available() else [])
+        for name in backends:
+            with override_settings(SEARCH_BACKEND=name):
+                # Индекс из прошлого прогона на той же базе не в счёт.
+                search.backend().clear()
+                sizes[name] = self.pages(search.rebuild)
+        for name, size in sizes.items():
+            self.stdout.write(f'{name:>10}: {size / 2 ** 20:9.1f} МБ')
+        methods = [('icontains', self.like)] + [
+            (name, self.backend_search(name)) for name in backends]
+        self.stdout.write(
+            f'{"запрос":>14} {"метод":>9} {"найдено":>8} {"мс":>9}')
+        for query in QUERIES:
+            for name, method in methods:
+                timings, found = [], 0
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    found = len(method(query))
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f'{query:>14} {name:>9} {found:>8} '
+                    f'{statistics.median(timings) * 1000:9.2f}')
+
+    def pages(self, build, *args):
+        """Сколько байт базы заняли данные, записанные build(*args)."""
+        with connection.cursor() as cursor:
+            def used():
+                cursor.execute('PRAGMA page_count')
+                total = cursor.fetchone()[0]
+                cursor.execute('PRAGMA freelist_count')
+                return total - cursor.fetchone()[0]
+            before = used()
+            build(*args)
+            after = used()
+            cursor.execute('PRAGMA page_size')
+            return (after - before) * cursor.fetchone()[0]
+
+    def posts(self, total, seed):
+        rnd = random.Random(seed)
+        vocabulary = [
+            ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+            + 'к'
+            for _ in range(VOCABULARY)
+        ]
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        for number in range(total):
+            words = []
+            for _ in range(rnd.randint(8, 30)):
+                roll = rnd.random()
+                if roll < 0.02:
+                    stem, endings = rnd.choice(STEMS)
+                    words.append(stem + rnd.choice(endings))
+                elif roll < 0.5:
+                    words.append(rnd.choice(FILLER))
+                else:
+                    rank = int(rnd.paretovariate(1)) - 1
+                    words.append(vocabulary[rank % VOCABULARY]
+                                 + rnd.choice(NOUN_ENDINGS))
+            yield ' '.join(words).capitalize(), start + timedelta(
+                minutes=number)
+
+    def load(self, total, seed):
+        # Посты пишутся без сигналов: индексы строит search.rebuild().
+        author, _ = get_user_model().objects.get_or_create(
+            username='search-benchmark')
+        chunk = []
+        for text, pub_date in self.posts(total, seed):
+            chunk.append(Post(author=author, text=text, pub_date=pub_date))
+            if len(chunk) == CHUNK:
+                with transaction.atomic():
+                    bulk_insert(Post, chunk)
+                chunk = []
+        with transaction.atomic():
+            bulk_insert(Post, chunk)
+
+    def like(self, query):
+        # Поиск до индексов: text__icontains на каждое слово.
+        posts = Post.objects.all()
+        for word in query.split():
+            posts = posts.filter(text__icontains=word)
+        return list(posts.values_list('id', flat=True)[:SEARCH_LIMIT])
+
+    def backend_search(self, name):
+        def method(query):
+            with override_settings(SEARCH_BACKEND=name):
+                return search.search(query)
+        return method
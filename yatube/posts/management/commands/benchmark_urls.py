@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import object_cache, perf
+from posts import benchmark, datagen
+from posts.models import Post
+
+BASELINE = os.path.join(
+    settings.BASE_DIR, 'posts', 'benchmarks', 'urls.json')
+
+
+def _clear():
+    cache.clear()
+    object_cache.clear_local()
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет все адреса posts/urls.py на синтетических наборах разного '
+        'размера и сравнивает задержку, запросы к базе и память с '
+        'базовой линией. Каждый набор живёт в отдельной базе SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=[10000, 100000, 1000000], help='Число постов.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов к каждому адресу.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--urls', nargs='+', choices=benchmark.TARGETS,
+                            default=list(benchmark.TARGETS))
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Сбрасывать кэш перед каждым запросом.')
+        parser.add_argument(
+            '--guest', action='store_true',
+            help='Открытые страницы смотреть без входа.')
+        parser.add_argument(
+            '--data-dir',
+            help='Где хранить базы наборов между запусками; по умолчанию '
+                 'временный каталог.')
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты в базовую линию.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Допустимый рост p95 и памяти, доля.')
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        directory = options['data_dir'] or tempfile.mkdtemp()
+        os.makedirs(directory, exist_ok=True)
+        results, problems = {}, []
+        caches = dict(settings.CACHES, default={
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+        })
+        with perf.production_settings(ALLOWED_HOSTS=['testserver'],
+                                      CACHES=caches):
+            try:
+                for size in options['sizes']:
+                    # Режимы меряют разное и сравниваются только с собой.
+                    key = str(size) + ''.join(
+                        f'-{mode}' for mode in ('guest', 'cold')
+                        if options[mode])
+                    results[key] = self.run_size(size, directory, options)
+                    problems += [
+                        f'{key}: {problem}' for problem in benchmark.compare(
+                            results[key], baseline.get(key, {}),
+                            options['tolerance'])
+                    ]
+            finally:
+                if not options['data_dir']:
+                    shutil.rmtree(directory, ignore_errors=True)
+        if options['save']:
+            baseline.update(results)
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(baseline, file, indent=2, sort_keys=True)
+                file.write('\n')
+            self.stdout.write(f'Базовая линия: {options["baseline"]}')
+        elif problems:
+            raise CommandError(
+                'Регрессии:\n' + '\n'.join(problems))
+
+    def run_size(self, size, directory, options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        test_settings['NAME'] = os.path.join(
+            directory, f'benchmark-{size}-{options["seed"]}.sqlite3')
+        keep = bool(options['data_dir'])
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+        try:
+            if not Post.objects.exists():
+                self.stdout.write(f'Набор на {size} постов…')
+                counts = datagen.load(
+                    datagen.Spec(posts=size, seed=options['seed']))
+                self.stdout.write(', '.join(
+                    f'{name}: {count}' for name, count in counts.items()))
+            _clear()
+            data = benchmark.Dataset(guest=options['guest'])
+            self.stdout.write(
+                f'{"постов":>8} {"адрес":<17}{"p50":>9}{"p95":>9}{"p99":>9}'
+                f'{"запросов":>9}{"КБ":>8}')
+            results = {}
+            for name in options['urls']:
+                results[name] = result = benchmark.measure(
+                    data, name, options['requests'], options['seed'],
+                    clear=_clear if options['cold'] else None)
+                self.stdout.write(
+                    f'{size:>8} {name:<17}{result["p50"]:>9.2f}'
+                    f'{result["p95"]:>9.2f}{result["p99"]:>9.2f}'
+                    f'{result["queries"]:>9}{result["alloc_kb"]:>8}')
+            return results
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=keep)
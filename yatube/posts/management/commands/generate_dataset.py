@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import datagen
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками. Одинаковые параметры дают одинаковые '
+        'данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--users', type=int,
+            help='По умолчанию — пользователь на 20 постов.')
+        parser.add_argument(
+            '--groups', type=int,
+            help='По умолчанию — группа на 2000 постов.')
+        parser.add_argument('--comments', type=float, default=1.0,
+                            help='Среднее число комментариев к посту.')
+        parser.add_argument('--follows', type=float, default=10.0,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--images', type=float, default=0.2,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--grouped', type=float, default=0.7,
+                            help='Доля постов в группах.')
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель степенного закона активности и популярности.')
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Начало имён пользователей и slug групп.')
+        parser.add_argument('--chunk', type=int, default=datagen.CHUNK_SIZE,
+                            help='Строк на транзакцию.')
+        parser.add_argument(
+            '--password',
+            help='Общий пароль пользователей; без него войти нельзя.')
+        parser.add_argument(
+            '--image-files', action='store_true',
+            help='Положить картинки в MEDIA_ROOT и нарезать их.')
+
+    def handle(self, *args, **options):
+        spec = datagen.Spec(
+            posts=options['posts'],
+            users=options['users'],
+            groups=options['groups'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            grouped=options['grouped'],
+            skew=options['skew'],
+            days=options['days'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+        )
+        started = time.monotonic()
+
+        def log(message):
+            self.stdout.write(
+                f'{time.monotonic() - started:7.1f} с  {message}')
+
+        counts = datagen.load(
+            spec, log,
+            chunk_size=options['chunk'],
+            password=options['password'],
+            image_files=options['image_files'],
+        )
+        self.stdout.write(', '.join(
+            f'{name}: {count}' for name, count in counts.items()))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Нарезает картинки постов, у которых ещё нет готовых размеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать нарезки у всех постов с картинками.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnails='')
+        done = 0
+        for post in posts.iterator():
+            thumbnails.generate(post)
+            done += 1
+        self.stdout.write(f'Нарезано постов: {done}')
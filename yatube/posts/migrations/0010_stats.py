@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def _counts(model, field):
+    return dict(
+        model.objects.order_by().values(field).annotate(
+            n=Count('id')).values_list(field, 'n')
+    )
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    posts = _counts(Post, 'author_id')
+    followers = _counts(Follow, 'author_id')
+    following = _counts(Follow, 'user_id')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk, posts_count=posts.get(pk, 0),
+                      followers_count=followers.get(pk, 0),
+                      following_count=following.get(pk, 0))
+            for pk in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+    )
+    group_posts = _counts(Post, 'group_id')
+    GroupStats.objects.bulk_create(
+        (
+            GroupStats(group_id=pk, posts_count=group_posts.get(pk, 0))
+            for pk in Group.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0009_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:19
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+import django.db.models.expressions
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    """Оставляет по одной подписке на пару и убирает подписки на себя."""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    touched = set()
+    duplicates = Follow.objects.order_by().values(
+        'user_id', 'author_id'
+    ).annotate(keep=Min('id'), n=Count('id')).filter(n__gt=1)
+    for pair in duplicates:
+        Follow.objects.filter(
+            user_id=pair['user_id'], author_id=pair['author_id']
+        ).exclude(id=pair['keep']).delete()
+        touched.update((pair['user_id'], pair['author_id']))
+    self_follows = Follow.objects.filter(user_id=F('author_id'))
+    touched.update(self_follows.values_list('user_id', flat=True))
+    self_follows.delete()
+    # Сигналы в миграциях не срабатывают: счётчики правим сами.
+    for user_id in touched:
+        UserStats.objects.filter(user_id=user_id).update(
+            followers_count=Follow.objects.filter(author_id=user_id).count(),
+            following_count=Follow.objects.filter(user_id=user_id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.RunPython(
+            drop_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='no_self_follow'),
+        ),
+    ]
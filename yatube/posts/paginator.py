@@ -0,0 +1,251 @@
+import base64
+import binascii
+import heapq
+from collections import namedtuple
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Строка KeySource: только ключ сортировки, без объекта.
+Key = namedtuple('Key', 'pub_date pk')
+
+
+def encode_cursor(key, direction):
+    """Упаковывает ключ (pub_date, id) в непрозрачный токен для ?cursor=."""
+    date, pk = key
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (ключ, направление); битый токен — (None, NEXT)."""
+    if not token:
+        return None, NEXT
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, date, pk = raw.decode().split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None, NEXT
+    if date is None or direction not in (NEXT, PREVIOUS):
+        return None, NEXT
+    return (date, pk), direction
+
+
+def keyset(queryset, fields, key, direction, limit):
+    """queryset за ключом key в порядке обхода, не больше limit строк.
+
+    NEXT идёт от новых к старым, PREVIOUS — от старых к новым.
+    Условие записано как `date <= X AND (date < X OR id < Y)`,
+    чтобы индекс по дате давал диапазон, а не полный проход.
+    """
+    date, pk = fields
+    newer = direction == PREVIOUS
+    if key is not None:
+        strict, loose = ('gt', 'gte') if newer else ('lt', 'lte')
+        queryset = queryset.filter(
+            Q(**{f'{date}__{loose}': key[0]}),
+            Q(**{f'{date}__{strict}': key[0]})
+            | Q(**{f'{pk}__{strict}': key[1]}),
+        )
+    if newer:
+        ordering = (date, pk)
+    else:
+        ordering = (f'-{date}', f'-{pk}')
+    return queryset.order_by(*ordering)[:limit]
+
+
+class QuerySetSource:
+    """Строки ленты из queryset с ключом сортировки (pub_date, id)."""
+
+    def __init__(self, queryset, fields=('pub_date', 'id')):
+        self.queryset = queryset
+        self.fields = fields
+
+    def key(self, obj):
+        return tuple(getattr(obj, name) for name in self.fields)
+
+    def item(self, obj):
+        """Объект, который попадёт на страницу вместо строки источника."""
+        return obj
+
+    def select(self, key, direction, limit):
+        return keyset(self.queryset, self.fields, key, direction, limit)
+
+    def fetch(self, key, direction, limit):
+        """До limit строк за ключом key в порядке обхода (см. keyset)."""
+        return list(self.select(key, direction, limit))
+
+
+class KeySource(QuerySetSource):
+    """Источник, который читает только ключи (дата, id).
+
+    Для страниц, строки которых дочитываются отдельным запросом:
+    моделей не создаётся, а из индекса берутся две колонки.
+    """
+
+    def __init__(self, queryset, fields=('pub_date', 'id')):
+        super().__init__(queryset.values_list(*fields), fields)
+
+    def key(self, row):
+        return tuple(row)
+
+    def fetch(self, key, direction, limit):
+        return [Key(*row) for row in super().fetch(key, direction, limit)]
+
+
+class UnionSource(QuerySetSource):
+    """Строки queryset из нескольких частей одним запросом.
+
+    Части — например, посты каждого из авторов — входят в запрос
+    подзапросами `id IN (… ORDER BY … LIMIT n)`, и каждая читается
+    своим индексом. Сколько бы ни было частей, это один запрос, а
+    сортируется в Python не больше limit строк на часть: author_id__in
+    сортировал бы все посты авторов во временном B-дереве.
+    """
+
+    def __init__(self, queryset, parts, fields=('pub_date', 'id')):
+        super().__init__(queryset, fields)
+        self.parts = list(parts)
+
+    def select(self, key, direction, limit):
+        pk = self.fields[1]
+        condition = Q()
+        for part in self.parts:
+            condition |= Q(**{f'{pk}__in': keyset(
+                part.values(pk), self.fields, key, direction, limit)})
+        # Порядок Meta.ordering здесь лишний: строки сортирует fetch().
+        return self.queryset.filter(condition).order_by()
+
+    def fetch(self, key, direction, limit):
+        if not self.parts:
+            return []
+        rows = super().fetch(key, direction, limit)
+        rows.sort(key=self.key, reverse=direction == NEXT)
+        return rows[:limit]
+
+
+class UnionKeySource(UnionSource, KeySource):
+    """UnionSource, который читает только ключи, как KeySource."""
+
+
+class MergedSource:
+    """Несколько источников одной ленты, слитые по ключу.
+
+    Строки источников сразу превращаются в объекты страницы; повторы
+    одного объекта из разных источников отбрасываются.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def key(self, obj):
+        return obj.pub_date, obj.pk
+
+    def item(self, obj):
+        return obj
+
+    def fetch(self, key, direction, limit):
+        runs = [
+            [source.item(row)
+             for row in source.fetch(key, direction, limit)]
+            for source in self.sources
+        ]
+        merged = heapq.merge(
+            *runs, key=self.key, reverse=direction == NEXT)
+        rows, seen = [], set()
+        for obj in merged:
+            if obj.pk in seen:
+                continue
+            seen.add(obj.pk)
+            rows.append(obj)
+            if len(rows) == limit:
+                break
+        return rows
+
+
+class RankedSource(QuerySetSource):
+    """Строки queryset в порядке списка ids, а не по дате.
+
+    Для выдачи поиска, где порядок задаёт релевантность. Курсор — тот
+    же ключ (дата, id), место в списке находится по id; за страницу
+    читаются только её строки.
+    """
+
+    def __init__(self, queryset, ids, fields=('pub_date', 'id')):
+        super().__init__(queryset, fields)
+        self.ids = list(ids)
+        self.positions = {pk: number for number, pk in enumerate(self.ids)}
+
+    def fetch(self, key, direction, limit):
+        if key is None:
+            ids = self.ids[:limit]
+        elif key[1] not in self.positions:
+            # Выдача сменилась, и строки с этим ключом в ней нет.
+            return []
+        elif direction == NEXT:
+            start = self.positions[key[1]] + 1
+            ids = self.ids[start:start + limit]
+        else:
+            end = self.positions[key[1]]
+            ids = self.ids[max(end - limit, 0):end][::-1]
+        rows = self.queryset.in_bulk(ids, field_name=self.fields[1])
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без OFFSET и COUNT(*).
+
+    Номера страниц условные: у самой новой страницы 1, у остальных 2.
+    has_next() и has_previous() у страниц при этом честные.
+    """
+
+    def __init__(self, object_list, per_page, source=None):
+        super().__init__(object_list, per_page)
+        self.source = source or QuerySetSource(object_list)
+        self.cursor = ''
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def get_page(self, cursor):
+        key, direction = decode_cursor(cursor)
+        rows = self.source.fetch(key, direction, self.per_page + 1)
+        more = len(rows) > self.per_page
+        if direction == PREVIOUS and not more:
+            # Выше ключа меньше целой страницы — это самая новая страница.
+            key, direction = None, NEXT
+            rows = self.source.fetch(None, NEXT, self.per_page + 1)
+            more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = key is not None, more
+        if key is not None:
+            self.cursor = cursor
+        if rows and has_next:
+            self.next_cursor = encode_cursor(
+                self.source.key(rows[-1]), NEXT)
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(
+                self.source.key(rows[0]), PREVIOUS)
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        return Page([self.source.item(row) for row in rows], number, self)
+
+    page = get_page
+
+
+def paginate(request, queryset, per_page, source=None):
+    """Страница ленты: ?page=N по-старому, иначе по ?cursor=."""
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        return Paginator(queryset, per_page).get_page(page_number)
+    paginator = CursorPaginator(queryset, per_page, source)
+    return paginator.get_page(request.GET.get('cursor'))
@@ -0,0 +1,61 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс обновляют сигналы Post; для уже имеющихся данных есть команда
+`manage.py rebuild_search_index`. Результаты упорядочены по
+релевантности с поправкой на свежесть поста.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import fts, inverted
+from posts.search.tokens import tokenize
+
+SEARCH_LIMIT = 1000
+# Пост такого возраста при той же релевантности идёт вдвое ниже нового.
+RECENCY_DAYS = 30
+BATCH_SIZE = 500
+
+
+def backend():
+    name = settings.SEARCH_BACKEND
+    if name is None:
+        name = 'fts' if fts.available() else 'inverted'
+    return fts if name == 'fts' else inverted
+
+
+def index_post(post):
+    backend().index([(post.id, tokenize(post.text))])
+
+
+def remove_post(post_id):
+    backend().remove([post_id])
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """id постов, где есть все слова запроса, от лучших к худшим."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    return backend().search(terms, limit, RECENCY_DAYS)
+
+
+def index_posts(posts):
+    """Индексирует пары (id, текст) пачками; возвращает их число."""
+    index = backend()
+    total, rows = 0, []
+    for post_id, text in posts:
+        rows.append((post_id, tokenize(text)))
+        if len(rows) == BATCH_SIZE:
+            index.index(rows)
+            total, rows = total + len(rows), []
+    index.index(rows)
+    return total + len(rows)
+
+
+def rebuild():
+    """Строит индекс заново по всем постам; возвращает их число."""
+    with transaction.atomic():
+        backend().clear()
+        return index_posts(
+            Post.objects.values_list('id', 'text').iterator())
@@ -0,0 +1,77 @@
+"""Индекс на виртуальной таблице SQLite FTS5.
+
+В таблицу кладутся уже разобранные термы через пробел, поэтому
+разбор текста у обоих индексов общий (posts.search.tokens).
+Строки пишутся многострочными запросами, а не executemany(): на нём
+падает SQL-панель debug toolbar, и в режиме DEBUG не сохранялся пост.
+"""
+from functools import lru_cache
+
+from django.db import connection
+
+TABLE = 'posts_search'
+
+
+# bm25() отрицательна: чем меньше, тем релевантнее. Деление на возраст
+# в единицах RECENCY_DAYS приглушает старые посты, не меняя знак.
+SEARCH_SQL = f'''
+    SELECT {TABLE}.rowid FROM {TABLE}
+    JOIN posts_post ON posts_post.id = {TABLE}.rowid
+    WHERE {TABLE} MATCH %s
+    ORDER BY bm25({TABLE}) / (
+        1 + (julianday('now') - julianday(posts_post.pub_date)) / %s
+    )
+    LIMIT %s
+'''
+
+
+@lru_cache(maxsize=None)
+def available():
+    """Есть ли FTS5 в SQLite, с которым работает соединение."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def match_query(terms):
+    # Каждый терм в кавычках: слова вроде AND и NOT не станут операторами.
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _batches(rows, columns):
+    size = max(connection.ops.bulk_batch_size(columns, rows), 1)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def index(rows):
+    rows = [(post_id, ' '.join(terms)) for post_id, terms in rows]
+    remove(post_id for post_id, _ in rows)
+    with connection.cursor() as cursor:
+        for batch in _batches(rows, ('rowid', 'body')):
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, body) VALUES '
+                + ', '.join(['(%s, %s)'] * len(batch)),
+                [value for row in batch for value in row])
+
+
+def remove(post_ids):
+    post_ids = list(post_ids)
+    with connection.cursor() as cursor:
+        for batch in _batches(post_ids, ('rowid',)):
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN '
+                f'({", ".join(["%s"] * len(batch))})', batch)
+
+
+def clear():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def search(terms, limit, recency_days):
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, [match_query(terms), recency_days, limit])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,65 @@
+"""Обратный индекс в таблице PostTerm для баз без FTS5.
+
+Релевантность считается как TF-IDF по найденным записям индекса.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.object_cache import shared_timeout
+from posts.models import Post, PostTerm
+
+BATCH_SIZE = 500
+# Число постов нужно только для idf: немного устаревшее число почти не
+# меняет порядок выдачи, а COUNT(*) на каждый запрос — полный проход.
+TOTAL_KEY = 'search:inverted:total'
+TOTAL_TIMEOUT = 60 * 5
+
+
+def index(rows):
+    rows = list(rows)
+    remove(post_id for post_id, _ in rows)
+    PostTerm.objects.bulk_create(
+        (
+            PostTerm(term=term, post_id=post_id, count=count)
+            for post_id, terms in rows
+            for term, count in Counter(terms).items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def remove(post_ids):
+    PostTerm.objects.filter(post_id__in=list(post_ids)).delete()
+
+
+def clear():
+    PostTerm.objects.all().delete()
+
+
+def search(terms, limit, recency_days):
+    terms = set(terms)
+    postings = PostTerm.objects.filter(term__in=terms).values_list(
+        'term', 'post_id', 'count', 'post__pub_date')
+    hits = defaultdict(dict)
+    dates = {}
+    for term, post_id, count, pub_date in postings.iterator():
+        hits[term][post_id] = count
+        dates[post_id] = pub_date
+    if len(hits) < len(terms):
+        return []
+    total = cache.get_or_set(
+        TOTAL_KEY, Post.objects.count, shared_timeout(TOTAL_TIMEOUT))
+    scores = Counter()
+    found = set.intersection(*(set(posts) for posts in hits.values()))
+    for posts in hits.values():
+        idf = math.log(1 + total / len(posts))
+        for post_id in found:
+            scores[post_id] += posts[post_id] * idf
+    now = timezone.now()
+    for post_id in found:
+        age = (now - dates[post_id]).total_seconds() / 86400
+        scores[post_id] /= 1 + max(age, 0) / recency_days
+    return [post_id for post_id, _ in scores.most_common(limit)]
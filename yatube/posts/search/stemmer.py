@@ -0,0 +1,82 @@
+"""Лёгкие стеммеры для русского и английского.
+
+Русский — алгоритм Snowball (Портера) для русского языка, английский —
+упрощённое отсечение окончаний множественного числа и -ing/-ed.
+Оба работают со словами в нижнем регистре, ё уже заменена на е.
+"""
+import re
+from functools import lru_cache
+
+RU_RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+RU_PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+RU_REFLEXIVE = re.compile(r'(с[яь])$')
+RU_ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$')
+RU_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+RU_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+RU_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+RU_DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+RU_DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+RU_SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+EN_VOWEL = re.compile(r'[aeiouy]')
+EN_DOUBLE = re.compile(r'([bdfgmnprt])\1$')
+
+
+def _cut(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+@lru_cache(maxsize=100000)
+def stem_ru(word):
+    match = RU_RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    cut = _cut(RU_PERFECTIVE_GERUND, rv)
+    if cut == rv:
+        rv = _cut(RU_REFLEXIVE, rv)
+        cut = _cut(RU_ADJECTIVE, rv)
+        if cut != rv:
+            rv = _cut(RU_PARTICIPLE, cut)
+        else:
+            cut = _cut(RU_VERB, rv)
+            rv = _cut(RU_NOUN, rv) if cut == rv else cut
+    else:
+        rv = cut
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if RU_DERIVATIONAL.match(rv):
+        rv = _cut(RU_DERIVATIONAL_SUFFIX, rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = _cut(RU_SUPERLATIVE, rv)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+@lru_cache(maxsize=100000)
+def stem_en(word):
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith(('sses', 'xes', 'ches', 'shes')):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ing', 'ed'):
+        base = word[:-len(suffix)]
+        if word.endswith(suffix) and len(base) > 2 and EN_VOWEL.search(base):
+            word = EN_DOUBLE.sub(r'\1', base)
+            break
+    return word
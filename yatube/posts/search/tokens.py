@@ -0,0 +1,24 @@
+import re
+
+from posts.search.stemmer import stem_en, stem_ru
+
+MAX_TERM_LENGTH = 64
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+LATIN_RE = re.compile('[a-z]')
+
+
+def normalize(word):
+    """Основа слова: ё сливается с е, окончания отсекает стеммер языка."""
+    word = word.replace('ё', 'е')
+    if CYRILLIC_RE.search(word):
+        word = stem_ru(word)
+    elif LATIN_RE.search(word):
+        word = stem_en(word)
+    return word[:MAX_TERM_LENGTH]
+
+
+def tokenize(text):
+    """Термы текста в порядке появления."""
+    return [normalize(word) for word in WORD_RE.findall(text.casefold())]
@@ -0,0 +1,149 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs
+from posts import (cards, comments, counters, feed_cache, lookups, search,
+                   tasks, timeline)
+from posts.models import (Comment, Follow, Group, GroupStats, Post, User,
+                          UserStats)
+
+
+# Поля пользователя, которые видны в карточках и комментариях.
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Вход в систему сохраняет только last_login: имя не трогаем.
+    if instance.pk and not raw and (
+            not update_fields or set(NAME_FIELDS) & set(update_fields)):
+        instance._previous_names = User.objects.filter(
+            pk=instance.pk).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+    if created:
+        # Отсутствие пользователя с таким username могло попасть в кэш.
+        lookups.users.invalidate(instance.username)
+    previous = instance.__dict__.pop('_previous_names', None)
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if previous is None or previous == names:
+        return
+    lookups.users.invalidate(instance.username, previous[0])
+    # Имя и ссылка на профиль есть в карточках постов и в комментариях.
+    feed_cache.bump('posts', f'author:{instance.pk}',
+                    f'profile:{instance.pk}', f'user:{instance.pk}')
+    jobs.enqueue(tasks.refresh_author_names, instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    lookups.users.invalidate(instance.username)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', 'author_id').first()
+        if previous is not None:
+            (instance._previous_group_id,
+             instance._previous_author_id) = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.post_added(instance)
+        # Отсутствие поста с таким id могло попасть в кэш.
+        lookups.post_authors.invalidate(instance.pk)
+    previous_author_id = getattr(instance, '_previous_author_id', None)
+    if not created:
+        counters.post_moved(
+            instance, getattr(instance, '_previous_group_id', None),
+            previous_author_id)
+    reassigned = previous_author_id not in (None, instance.author_id)
+    if reassigned:
+        lookups.post_authors.invalidate(instance.pk)
+    cards.invalidate(instance.id)
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+    update_fields = kwargs.get('update_fields')
+    if not update_fields or 'text' in update_fields:
+        search.index_post(instance)
+    if created:
+        jobs.enqueue(tasks.fan_out_post, instance.id)
+    elif reassigned:
+        jobs.enqueue(tasks.reassign_post, instance.id, previous_author_id)
+    else:
+        jobs.enqueue(tasks.refresh_follow_feeds, instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_removed(instance)
+    lookups.post_authors.invalidate(instance.pk)
+    cards.invalidate(instance.id)
+    search.remove_post(instance.id)
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+    jobs.enqueue(tasks.refresh_follow_feeds, instance.author_id)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+    feed_cache.bump('groups', f'group:{instance.id}')
+    lookups.groups.invalidate(
+        instance.slug, getattr(instance, '_previous_slug', None))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.bump('groups', f'group:{instance.id}')
+    lookups.groups.invalidate(instance.slug)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        comments.invalidate(instance.post_id)
+        feed_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        # Сигнал идёт в транзакции создания подписки: счётчик здесь
+        # ровно тот, до которого его сдвинула эта подписка.
+        count = timeline.follower_count(instance.author_id)
+        feed_cache.bump(f'profile:{instance.user_id}',
+                        f'profile:{instance.author_id}')
+        # Список «звёзд» меняется сразу, записи ленты пишет задача.
+        timeline.forget(instance.user_id)
+        jobs.enqueue(tasks.backfill_timeline,
+                     instance.user_id, instance.author_id, count)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    count = timeline.follower_count(instance.author_id)
+    feed_cache.bump(f'profile:{instance.user_id}',
+                    f'profile:{instance.author_id}')
+    timeline.forget(instance.user_id)
+    jobs.enqueue(tasks.prune_timeline,
+                 instance.user_id, instance.author_id, count)
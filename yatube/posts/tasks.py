@@ -0,0 +1,72 @@
+from core.jobs import enqueue, task
+from posts import comments, feed_cache, thumbnails, timeline
+from posts.models import Comment, Post
+
+
+@task
+def generate_thumbnails(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    thumbnails.generate(post)
+    feed_cache.bump(*feed_cache.post_scopes(post))
+    refresh_follow_feeds(post.author_id)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    followers = timeline.fanout_followers(post.author_id)
+    timeline.fan_out(post, followers)
+    feed_cache.bump(*[f'follow:{user_id}' for user_id in followers])
+
+
+@task
+def refresh_follow_feeds(author_id):
+    followers = timeline.fanout_followers(author_id)
+    feed_cache.bump(*[f'follow:{user_id}' for user_id in followers])
+
+
+@task
+def reassign_post(post_id, previous_author_id):
+    """Переносит пост из лент подписчиков прежнего автора к новому."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    timeline.retract(post.id)
+    fan_out_post(post.id)
+    refresh_follow_feeds(previous_author_id)
+
+
+@task
+def refresh_author_names(author_id):
+    """Сбрасывает ленты групп и подписок и комментарии с именем автора."""
+    refresh_follow_feeds(author_id)
+    group_ids = Post.objects.filter(
+        author_id=author_id, group__isnull=False
+    ).order_by().values_list('group_id', flat=True).distinct()
+    post_ids = list(Comment.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('post_id', flat=True).distinct())
+    comments.invalidate_many(post_ids)
+    feed_cache.bump(*[f'group:{group_id}' for group_id in group_ids],
+                    *[f'post:{post_id}' for post_id in post_ids])
+
+
+@task
+def backfill_timeline(user_id, author_id, count=None):
+    timeline.backfill(user_id, author_id, count)
+
+
+@task
+def prune_timeline(user_id, author_id, count=None):
+    if timeline.prune(user_id, author_id, count):
+        # Подписчиков до тысячи: раскладка — отдельной задачей.
+        enqueue(backfill_followers, author_id)
+
+
+@task
+def backfill_followers(author_id):
+    timeline.backfill_followers(author_id)
@@ -0,0 +1,137 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import benchmark, datagen, search, urls
+from posts.models import (Comment, Follow, Post, TimelineEntry, User,
+                          UserStats)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class DatagenTest(TestCase):
+    def test_same_spec_gives_same_rows(self):
+        datagen.load(datagen.Spec(posts=100, seed=3, prefix='a'))
+        first = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author__username', 'image'))
+        Post.objects.all().delete()
+        datagen.load(datagen.Spec(posts=100, seed=3, prefix='b'))
+        second = list(Post.objects.order_by('id').values_list(
+            'text', 'pub_date', 'author__username', 'image'))
+        self.assertEqual(
+            [row[:2] + (row[2][1:],) + row[3:] for row in first],
+            [row[:2] + (row[2][1:],) + row[3:] for row in second])
+
+    def test_derived_data_is_built(self):
+        counts = datagen.load(datagen.Spec(posts=300))
+        self.assertEqual(counts['Post'], Post.objects.count())
+        self.assertEqual(counts['Comment'], Comment.objects.count())
+        self.assertEqual(
+            UserStats.objects.aggregate(n=Sum('posts_count'))['n'], 300)
+        self.assertEqual(
+            UserStats.objects.aggregate(n=Sum('followers_count'))['n'],
+            Follow.objects.count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(search.search(datagen.WORDS[0]))
+
+    def test_fan_out_matches_followers(self):
+        datagen.load(datagen.Spec(posts=300))
+        expected = sum(
+            Follow.objects.filter(author_id=author_id).count()
+            for author_id in Post.objects.values_list('author_id', flat=True)
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected)
+
+    def test_means_match_spec(self):
+        spec = datagen.Spec(posts=5000, comments=1.0, follows=10.0)
+        rnd = datagen.random.Random(1)
+        rows = [(number, datagen.START) for number in range(spec.posts)]
+        comments = sum(1 for _ in datagen.comments(spec, rnd, rows, [1]))
+        self.assertAlmostEqual(comments / spec.posts, 1.0, delta=0.05)
+        user_ids = list(range(1000))
+        follows = sum(1 for _ in datagen.follows(spec, rnd, user_ids))
+        self.assertAlmostEqual(follows / len(user_ids), 10.0, delta=0.5)
+
+    def test_rank_is_skewed(self):
+        rnd = datagen.random.Random(1)
+        ranks = [datagen.rank(rnd, 1000) for _ in range(10000)]
+        self.assertTrue(all(0 <= value < 1000 for value in ranks))
+        self.assertGreater(ranks.count(0), ranks.count(500) * 50)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDatasetCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command(
+            'generate_dataset', posts=100, users=10, groups=2, images=0.5,
+            password='секрет-123', image_files=True, stdout=out)
+        self.assertIn('Post: 100', out.getvalue())
+        self.assertEqual(User.objects.count(), 10)
+        self.assertTrue(Client().login(username='user0',
+                                       password='секрет-123'))
+        post = Post.objects.exclude(image='').first()
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertTrue(post.thumbnail_urls)
+        # Заглушки адресов заменены настоящими нарезками.
+        self.assertFalse(Post.objects.filter(
+            thumbnails__contains='cache/synthetic').exists())
+
+
+class BenchmarkTest(TestCase):
+    def test_every_url_has_target(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(benchmark.TARGETS))
+
+    def test_measure_every_url(self):
+        datagen.load(datagen.Spec(posts=200))
+        data = benchmark.Dataset(guest=True)
+        for name in benchmark.TARGETS:
+            with self.subTest(url=name):
+                result = benchmark.measure(
+                    data, name, 3, clear=cache.clear)
+                self.assertEqual(
+                    set(result),
+                    {'p50', 'p95', 'p99', 'queries', 'alloc_kb'})
+                self.assertGreater(result['queries'], 0)
+
+    def test_feeds_follow_cursor_links(self):
+        datagen.load(datagen.Spec(posts=50))
+        data = benchmark.Dataset()
+        rnd = datagen.random.Random(1)
+        params = [benchmark.TARGETS['index'](data, rnd)[2]
+                  for _ in range(50)]
+        self.assertFalse(any('page' in param for param in params))
+        self.assertIn({}, params)
+        cursors = data.cursors[reverse('posts:index')]
+        self.assertIn(params[-1].get('cursor', ''), cursors)
+        self.assertGreater(len(cursors), 2)
+        # Лента короче FEED_DEPTH: дальше последней страницы не идём.
+        self.assertIsNone(cursors[-1])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_compare(self):
+        before = {'index': {'p95': 10, 'alloc_kb': 100, 'queries': 3}}
+        same = {'index': {'p95': 14, 'alloc_kb': 140, 'queries': 3}}
+        self.assertEqual(benchmark.compare(same, before, 0.5), [])
+        worse = {'index': {'p95': 16, 'alloc_kb': 100, 'queries': 4}}
+        self.assertEqual(len(benchmark.compare(worse, before, 0.5)), 2)
+        self.assertEqual(benchmark.compare({'new': same['index']}, {}, 0),
+                         [])
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import object_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        object_cache.clear_local()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def assert_changed(self, url, etag, change):
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_current_etag_gets_304(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_viewer_and_page(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(Client().get(url)['ETag'], etag)
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'], etag)
+
+    def test_changes_move_etag(self):
+        index, group, profile, detail = self.urls()
+        self.assert_changed(
+            index, self.client.get(index)['ETag'],
+            lambda: Post.objects.create(author=self.author, text='Новый'))
+        self.assert_changed(
+            profile, self.client.get(profile)['ETag'],
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author))
+        self.assert_changed(
+            detail, self.client.get(detail)['ETag'],
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Ответ'))
+
+    def test_new_csrf_secret_moves_etag(self):
+        # После повторного входа форма комментария из кэша браузера
+        # ушла бы со старым токеном.
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.client.force_login(self.author)
+        etag = self.client.get(detail)['ETag']
+        self.assertIn(settings.CSRF_COOKIE_NAME, self.client.cookies)
+        self.assert_changed(detail, etag, lambda: self.client.cookies.load(
+            {settings.CSRF_COOKIE_NAME: 'a' * 64}))
+
+    def test_anonymous_gets_last_modified(self):
+        Post.objects.create(author=self.author, text='Сдвиг поколения')
+        url = reverse('posts:index')
+        response = Client().get(url)
+        self.assertIn('Last-Modified', response)
+        response = Client().get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Last-Modified', self.client.get(url))
@@ -9,6 +9,7 @@ from django.urls import reverse
 from http import HTTPStatus
 from django import forms
 
+from posts import thumbnails
 from posts.models import Post, Group, Comment
 
 User = get_user_model()
@@ -84,6 +85,43 @@ class PostPagesTests(TestCase):
         self.assertEqual(created_post.author, self.user)
         self.assertEqual(created_post.image.read(), uploaded.open().read())
 
+    def test_post_create_prepares_thumbnails(self):
+        # Картинка нарезается при сохранении, лента берёт готовые адреса
+        uploaded = SimpleUploadedFile(
+            name='thumbs.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(set(post.thumbnail_urls), set(thumbnails.SIZES))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(
+            response, post.thumbnail_urls[thumbnails.FEED_SIZE])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_post_edit_drops_old_thumbnails(self):
+        # Нарезки старой картинки не живут дольше неё самой
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': SimpleUploadedFile(
+                'old.gif', self.small_gif, content_type='image/gif')},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        thumbnails.generate(post)
+        old_url = post.thumbnail_urls[thumbnails.FEED_SIZE]
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': post.text, 'image-clear': 'on'},
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.image.name, post.thumbnails), ('', ''))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, old_url)
+
     def test_post_edit(self):
         self.group = Group.objects.create(title='Тестовая группа',
                                           slug='test-group',
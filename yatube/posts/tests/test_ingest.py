@@ -0,0 +1,210 @@
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import comments, ingest, search
+from posts.models import (Comment, Follow, Group, GroupStats, Post,
+                          TimelineEntry, UserStats)
+
+User = get_user_model()
+PASSWORD = 'пароль-123'
+
+
+def ndjson(*records):
+    return [json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records]
+
+
+class IngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='import', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_keep_dates_and_update_derived_data(self):
+        result = ingest.ingest('posts', ndjson(
+            {'author': 'author', 'text': 'Старый пост про котов',
+             'group': 'import', 'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'author': 'author', 'text': 'Ещё пост'},
+        ), 'ndjson')
+        self.assertEqual((result.created, result.error_count), (2, 0))
+        old = Post.objects.get(text='Старый пост про котов')
+        self.assertEqual(
+            old.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2)
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).posts_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(search.search('коты'), [old.id])
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        lines = ndjson(
+            {'author': 'author', 'text': 'Годный пост'},
+            {'author': 'nobody', 'text': 'Чужой'},
+            {'author': 'author', 'text': ''},
+            {'author': 'author', 'text': 'Пост', 'group': 'missing'},
+            {'author': 'author', 'text': 'Пост', 'pub_date': 'вчера'},
+            {'author': 'author', 'text': 'Пост',
+             'pub_date': '2020-13-45T00:00:00'},
+            {'author': ['author'], 'text': 'Пост'},
+            [1, 2],
+        ) + ['{не json\n']
+        result = ingest.ingest('posts', lines, 'ndjson')
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.error_count, 8)
+        self.assertEqual(
+            [error['line'] for error in result.errors], list(range(2, 10)))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_broken_csv_line_is_skipped(self):
+        huge = 'я' * (csv.field_size_limit() + 1)
+        lines = io.StringIO(
+            f'author,text\nauthor,{huge}\nauthor,Целая строка\n')
+        result = ingest.ingest('posts', lines, 'csv')
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors[0]['line'], 2)
+        self.assertIn('Не CSV', result.errors[0]['error'])
+        self.assertTrue(Post.objects.filter(text='Целая строка').exists())
+
+    def test_comments_from_csv(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comments.comment_page(post.id)
+        lines = io.StringIO(
+            'post,author,text,created\n'
+            f'{post.id},reader,"Первый, с запятой",2016-01-01T00:00:00\n'
+            f'{post.id + 1},reader,Мимо,\n'
+        )
+        result = ingest.ingest('comments', lines, 'csv')
+        self.assertEqual((result.created, result.error_count), (1, 1))
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, 'Первый, с запятой')
+        self.assertEqual(comment.created.year, 2016)
+        self.assertIn('Первый, с запятой',
+                      comments.comment_page(post.id)['html'])
+
+    def test_queries_do_not_grow_with_rows(self):
+        def count(rows):
+            records = ndjson(*[
+                {'author': 'author', 'text': f'пост{number}'}
+                for number in range(rows)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                ingest.ingest('posts', records, 'ndjson')
+            return len(queries)
+
+        self.assertEqual(count(10), count(40))
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'posts.csv')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('author,text,group\nauthor,Из файла,import\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('ingest', 'posts', path, stdout=out, stderr=err)
+        os.remove(path)
+        os.rmdir(directory)
+        self.assertIn('Импортировано: 1', out.getvalue())
+        self.assertTrue(Post.objects.filter(text='Из файла').exists())
+
+
+class BulkImportEndpointTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username='staff', password=PASSWORD, is_staff=True)
+        cls.user = User.objects.create_user(
+            username='user', password=PASSWORD)
+
+    def post(self, user, body, content_type='application/x-ndjson',
+             kind='posts', password=PASSWORD):
+        # Скрипт не получает CSRF-токен: проверка CSRF включена.
+        client = Client(enforce_csrf_checks=True)
+        headers = {}
+        if user is not None:
+            credentials = f'{user.username}:{password}'.encode()
+            headers['HTTP_AUTHORIZATION'] = (
+                'Basic ' + base64.b64encode(credentials).decode())
+        return client.post(
+            reverse('api:import', kwargs={'kind': kind}),
+            body, content_type=content_type, **headers)
+
+    def test_staff_only(self):
+        body = ''.join(ndjson({'author': 'user', 'text': 'Пост'}))
+        response = self.post(None, body)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Basic', response['WWW-Authenticate'])
+        self.assertEqual(
+            self.post(self.staff, body, password='не тот').status_code, 401)
+        self.assertEqual(self.post(self.user, body).status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+    def test_session_is_not_enough(self):
+        client = Client()
+        client.force_login(self.staff)
+        body = ''.join(ndjson({'author': 'user', 'text': 'Пост'}))
+        response = client.post(
+            reverse('api:import', kwargs={'kind': 'posts'}),
+            body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 401)
+
+    def test_bad_encoding_reports_imported_chunks(self):
+        body = ''.join(ndjson(*[
+            {'author': 'user', 'text': f'Пост {number}'}
+            for number in range(3)
+        ])).encode() + b'\xff\n'
+        with mock.patch.object(ingest, 'CHUNK_SIZE', 2):
+            response = self.post(self.staff, body)
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data['created'], 2)
+        self.assertIn('UTF-8', data['detail'])
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_import(self):
+        body = ''.join(ndjson(
+            {'author': 'user', 'text': 'Пост'},
+            {'author': 'user', 'text': ''},
+        ))
+        response = self.post(self.staff, body)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['rejected']), (1, 1))
+        self.assertEqual(data['errors'][0]['line'], 2)
+        response = self.post(
+            self.staff, 'author,text\nuser,Из CSV\n', 'text/csv')
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(
+            self.post(self.staff, body, kind='groups').status_code, 404)
+
+    @override_settings(DEBUG=True, ROOT_URLCONF='posts.tests.urls_debug')
+    def test_import_with_debug_toolbar(self):
+        body = ''.join(ndjson(*[
+            {'author': 'user', 'text': f'Пост {number}'}
+            for number in range(3)
+        ]))
+        response = self.post(self.staff, body)
+        self.assertEqual(response.json()['created'], 3)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import object_cache
+from posts import lookups
+from posts.models import Group
+
+User = get_user_model()
+
+
+class LookupCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        object_cache.clear_local()
+        self.group = Group.objects.create(
+            title='Группа', slug='cached', description='Описание')
+
+    def test_second_lookup_skips_database(self):
+        lookups.groups.get('cached')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.groups.get('cached'), self.group)
+        object_cache.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.groups.get('cached'), self.group)
+
+    def test_missing_object_is_remembered_until_created(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'new'})
+        self.assertEqual(Client().get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertIsNone(lookups.groups.get('new'))
+        Group.objects.create(title='Новая', slug='new', description='')
+        self.assertEqual(Client().get(url).status_code, 200)
+
+    def test_rename_drops_old_key(self):
+        lookups.groups.get('cached')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIsNone(lookups.groups.get('cached'))
+        self.assertEqual(lookups.groups.get('renamed').title, 'Группа')
+
+    def test_user_edit_refreshes_profile(self):
+        user = User.objects.create_user(username='person')
+        lookups.users.get('person')
+        user.first_name = 'Имя'
+        user.save()
+        self.assertEqual(lookups.users.get('person').first_name, 'Имя')
+        user.delete()
+        self.assertIsNone(lookups.users.get('person'))
@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from posts.models import Post, Group
+from django.test import TestCase, TransactionTestCase
+from posts import counters
+from posts.models import Follow, Group, GroupStats, Post, UserStats
 
 User = get_user_model()
 
@@ -29,3 +30,72 @@ class PostModelTest(TestCase):
 
         post = PostModelTest.post
         self.assertEqual(str(post), post.text[:LEN_OF_POSTS])
+
+    def test_srcset_skips_missing_sizes(self):
+        post = Post(thumbnails='{"1920x678": "/big.jpg", "480x170": "/s.jpg"}')
+        self.assertEqual(post.thumbnail_srcset, '/s.jpg 480w, /big.jpg 1920w')
+        self.assertEqual(Post(thumbnails='').thumbnail_srcset, '')
+
+
+class StatsModelTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='stats-group',
+            description='Описание',
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_posts_and_subscriptions(self):
+        """Счётчики сдвигаются вместе с постами и подписками."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(GroupStats.objects.get(
+            group=self.group).posts_count, 1)
+        post.group = None
+        post.save()
+        self.assertEqual(GroupStats.objects.get(
+            group=self.group).posts_count, 0)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        """Пересчёт чинит разошедшиеся и пропавшие строки."""
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        self.assertEqual(counters.reconcile(), 2)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.assertEqual(counters.reconcile(), 0)
+
+
+class UserDeleteTest(TransactionTestCase):
+    def test_user_with_posts_and_followers_is_deleted(self):
+        """Удаление автора не воскрешает его строку счётчиков."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='delete-group', description='Описание')
+        Post.objects.create(author=author, text='Пост', group=group)
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=reader)
+        author.delete()
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(UserStats.objects.filter(user_id=author.pk).exists())
+        self.assertEqual(counters.user_stats(reader).followers_count, 0)
+        self.assertEqual(counters.user_stats(reader).following_count, 0)
+        self.assertEqual(GroupStats.objects.get(group=group).posts_count, 0)
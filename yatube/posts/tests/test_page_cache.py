@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import object_cache
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='pages', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        object_cache.clear_local()
+        self.guest = Client()
+
+    def urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:search') + '?q=пост',
+            reverse('about:author'),
+            reverse('about:tech'),
+        ]
+
+    def assert_hit(self, url):
+        object_cache.clear_local()
+        with self.assertNumQueries(0):
+            response = self.guest.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.templates, [])
+        return response
+
+    def test_hit_skips_view_and_templates(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                first = self.guest.get(url)
+                self.assertIn('Cookie', first['Vary'])
+                second = self.assert_hit(url)
+                self.assertEqual(second.content, first.content)
+
+    def test_hit_answers_conditional_get(self):
+        url = reverse('posts:index')
+        etag = self.guest.get(url)['ETag']
+        response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_never_sees_cached_page(self):
+        url = reverse('posts:index')
+        self.guest.get(url)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertTrue(response.templates)
+        # И вошедший не кладёт свою страницу анонимам.
+        self.assertNotContains(self.guest.get(url), 'Пользователь: reader')
+
+    def test_session_cookie_bypasses_cache(self):
+        url = reverse('posts:index')
+        self.guest.get(url)
+        self.guest.cookies[settings.SESSION_COOKIE_NAME] = 'expired'
+        self.assertTrue(self.guest.get(url).templates)
+
+    def test_events_invalidate_pages(self):
+        index, group, profile, detail = self.urls()[:4]
+        changes = [
+            (index, lambda: Post.objects.create(
+                author=self.author, text='Новый пост')),
+            (group, self.group.save),
+            (detail, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            (profile, lambda: Post.objects.filter(pk=self.post.pk).delete()),
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                self.guest.get(url)
+                change()
+                self.assertTrue(self.guest.get(url).templates)
+
+    def test_missing_page_is_not_cached(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': 10 ** 6})
+        self.assertEqual(self.guest.get(url).status_code, 404)
+        self.assertTrue(self.guest.get(url).templates)
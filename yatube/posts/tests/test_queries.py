@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import object_cache
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Потолок запросов на один GET к каждому адресу posts/urls.py при
+# холодном кэше. Новый адрес без бюджета роняет тест.
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 4,
+    'profile': 6,
+    'search': 4,
+    'post_detail': 6,
+    'post_create': 3,
+    'post_edit': 4,
+    'comments': 4,
+    'add_comment': 3,
+    'follow_index': 4,
+    'profile_follow': 12,
+    'profile_unfollow': 10,
+}
+# Посты всех «звёзд» из подписок читаются одним запросом сверх ленты.
+FOLLOW_INDEX_WITH_CELEBRITIES = QUERY_BUDGETS['follow_index'] + 1
+SMALL, LARGE = 3, 30
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget', description='Описание')
+        Follow.objects.create(user=cls.author, author=cls.friend)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def seed(self, volume):
+        """Доводит число постов каждого автора и комментариев до volume."""
+        for number in range(self.author.posts.count(), volume):
+            for user in (self.reader, self.friend, self.author):
+                post = Post.objects.create(
+                    author=user, group=self.group, text=f'Пост {number}')
+                Comment.objects.create(
+                    post=post, author=self.reader, text=f'Ответ {number}')
+        self.post = self.author.posts.latest('pub_date')
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text='Ещё ответ')
+            for _ in range(volume - self.post.comments.count())
+        )
+
+    def url(self, name):
+        kwargs = {
+            'group_list': {'slug': self.group.slug},
+            'profile': {'username': self.reader.username},
+            'post_detail': {'post_id': self.post.id},
+            'post_edit': {'post_id': self.post.id},
+            'comments': {'post_id': self.post.id},
+            'add_comment': {'post_id': self.post.id},
+            'profile_follow': {'username': self.reader.username},
+            'profile_unfollow': {'username': self.reader.username},
+        }
+        url = reverse(f'posts:{name}', kwargs=kwargs.get(name))
+        if name == 'search':
+            url += '?q=пост'
+        return url
+
+    def count_queries(self, name):
+        cache.clear()
+        object_cache.clear_local()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url(name))
+        self.assertLess(response.status_code, 400)
+        return len(queries)
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_queries_do_not_grow_with_data(self):
+        self.seed(SMALL)
+        small = {name: self.count_queries(name) for name in QUERY_BUDGETS}
+        self.seed(LARGE)
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(url=name):
+                large = self.count_queries(name)
+                self.assertEqual(large, small[name])
+                self.assertLessEqual(large, budget)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_index_does_not_grow_with_celebrities(self):
+        # С порогом 0 каждый автор из подписок — «звезда», и его посты
+        # подмешиваются при чтении ленты.
+        self.seed(SMALL)
+        one = self.count_queries('follow_index')
+        Follow.objects.create(user=self.author, author=self.reader)
+        two = self.count_queries('follow_index')
+        self.assertEqual(two, one)
+        self.assertLessEqual(two, FOLLOW_INDEX_WITH_CELEBRITIES)
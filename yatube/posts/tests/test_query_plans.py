@@ -0,0 +1,89 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Признаки плана, при которых запрос ленты читает таблицу целиком
+# или досортировывает строки после выборки.
+BAD_PLAN_MARKERS = ('USE TEMP B-TREE',)
+
+
+def bad_plan_lines(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        line for line in details
+        if line.startswith('SCAN') and 'USING' not in line
+        or any(marker in line for marker in BAD_PLAN_MARKERS)
+    ]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class FeedQueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.group = Group.objects.create(
+            title='Группа', slug='plans', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        for number in range(25):
+            post = Post.objects.create(
+                author=cls.star if number % 2 else cls.author,
+                group=cls.group,
+                text=f'Пост {number}',
+            )
+        cls.post = post
+        Comment.objects.create(post=post, author=cls.reader, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def assert_plans(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        # В SQLite captured_queries хранит запрос с подставленными
+        # параметрами, так что его можно отдать в EXPLAIN как есть.
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'posts_' not in sql:
+                continue
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(bad_plan_lines(sql), [])
+        return response
+
+    def test_feed_queries_use_indexes(self):
+        for url in self.feed_urls():
+            self.assert_plans(url)
+
+    def test_cursor_pages_use_indexes(self):
+        for url in self.feed_urls()[:4]:
+            page = self.assert_plans(url).context['page_obj']
+            self.assert_plans(url, {'cursor': page.paginator.next_cursor})
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import search
+from posts.models import Post
+from posts.search.tokens import tokenize
+
+User = get_user_model()
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+
+    def post(self, text, days_ago=0):
+        post = Post.objects.create(author=self.user, text=text)
+        if days_ago:
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.now() - timedelta(days=days_ago))
+        return post
+
+    def test_all_words_must_match(self):
+        both = self.post('Котики и собаки')
+        self.post('Только котики')
+        self.assertEqual(search.search('собаки КОТИКИ'), [both.id])
+        self.assertEqual(search.search('котики жирафы'), [])
+        self.assertEqual(search.search('  '), [])
+
+    def test_inflected_forms_match(self):
+        post = self.post('Читаю КНИГИ про ёлки')
+        self.assertEqual(search.search('книгой'), [post.id])
+        self.assertEqual(search.search('елка'), [post.id])
+
+    def test_ranked_by_relevance_then_recency(self):
+        # Частое слово весит больше, свежий пост выше старого
+        rare = self.post('Кофе и чай')
+        often = self.post('Кофе, кофе и снова кофе')
+        old = self.post('Кофе, кофе и снова кофе', days_ago=365)
+        self.assertEqual(search.search('кофе'), [often.id, rare.id, old.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.post('Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(search.search('старый'), [])
+        self.assertEqual(search.search('новый'), [post.id])
+        post.delete()
+        self.assertEqual(search.search('новый'), [])
+
+    @override_settings(DEBUG=True, ROOT_URLCONF='posts.tests.urls_debug')
+    def test_post_form_with_debug_toolbar(self):
+        # SQL-панель debug toolbar в режиме DEBUG оборачивает курсор и
+        # не умеет форматировать executemany().
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), {'text': 'Черновик поста'})
+        post = Post.objects.get(text='Черновик поста')
+        client.post(reverse('posts:post_edit', args=[post.id]),
+                    {'text': 'Готовый пост'})
+        self.assertEqual(search.search('черновик'), [])
+        self.assertEqual(search.search('готовый'), [post.id])
+
+    def test_rebuild_command_restores_index(self):
+        post = self.post('Потерянный пост')
+        search.backend().clear()
+        self.assertEqual(search.search('потерянный'), [])
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(search.search('потерянный'), [post.id])
+
+    def test_search_view_paginates(self):
+        for number in range(13):
+            self.post(f'Пост про поиск номер {number}')
+        url = reverse('posts:search')
+        ranked = search.search('поиск')
+        response = Client().get(url, {'q': 'поиск'})
+        first = response.context['page_obj']
+        self.assertEqual([post.id for post in first], ranked[:10])
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA')
+        cursor = first.paginator.next_cursor
+        response = Client().get(url, {'q': 'поиск', 'cursor': cursor})
+        second = response.context['page_obj']
+        self.assertEqual([post.id for post in second], ranked[10:])
+        response = Client().get(
+            url, {'q': 'поиск', 'cursor': second.paginator.previous_cursor})
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']], ranked[:10])
+
+
+class TokenizerTest(TestCase):
+    def test_russian_and_english_words_are_stemmed(self):
+        cases = {
+            'Книга книги КНИГОЙ книгами': ['книг'] * 4,
+            'Ёлка ёлки елкой': ['елк'] * 3,
+            'красивые красивая красивейший': ['красив'] * 3,
+            'подписка подписки подписке': ['подписк'] * 3,
+            'cats ponies boxes running played': [
+                'cat', 'pony', 'box', 'run', 'play'],
+            'post_2022 42': ['post_2022', '42'],
+        }
+        for text, terms in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(tokenize(text), terms)
+
+
+@override_settings(SEARCH_BACKEND='fts')
+class FtsSearchTest(SearchTestMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedSearchTest(SearchTestMixin, TestCase):
+    pass
@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class HybridTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_star_posts_are_not_fanned_out(self):
+        # Посты автора выше порога не пишутся в ленты подписчиков
+        post = Post.objects.create(author=self.star, text='Звезда')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        post = Post.objects.create(author=self.author, text='Автор')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_follow_index_merges_sources_in_order(self):
+        # Лента сливает готовые записи и посты «звёзд» по дате
+        posts = [
+            Post.objects.create(
+                author=self.star if number % 2 else self.author,
+                text=f'Пост {number}')
+            for number in range(15)
+        ]
+        posts.reverse()
+        url = reverse('posts:follow_index')
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(list(first), posts[:10])
+        second = self.client.get(
+            url, {'cursor': first.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(second), posts[10:])
+
+    def test_star_dropping_below_limit_is_fanned_out(self):
+        # Автор, опустившийся до порога, попадает в готовые ленты
+        post = Post.objects.create(author=self.star, text='Звезда')
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    def test_author_change_moves_post_and_counters(self):
+        # Пост с новым автором уходит из лент подписчиков прежнего
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.fan, author=other)
+        post = Post.objects.create(author=self.author, text='Автор')
+        post.author = other
+        post.save()
+        self.assertEqual(list(TimelineEntry.objects.filter(
+            post=post).values_list('user_id', 'author_id')),
+            [(self.fan.id, other.id)])
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 0)
+        self.assertEqual(UserStats.objects.get(user=other).posts_count, 1)
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_backfill_after_dropping_below_limit_is_queued(self):
+        # Раскладка по всем подписчикам идёт задачей, а не в запросе
+        post = Post.objects.create(author=self.star, text='Звезда')
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        jobs.work('test')
+        self.assertTrue(Job.objects.filter(
+            name='posts.tasks.backfill_followers').exists())
+        jobs.work('test')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_follow_writes_timeline_in_jobs(self):
+        # Подписка и отписка только ставят задачи на записи ленты
+        author = User.objects.create_user(username='newcomer')
+        post = Post.objects.create(author=author, text='Новичок')
+        jobs.work('test')
+        Follow.objects.create(user=self.fan, author=author)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.fan).exists())
+        self.assertTrue(Job.objects.filter(
+            name='posts.tasks.backfill_timeline').exists())
+        jobs.work('test')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.fan, post=post).exists())
+        Follow.objects.filter(user=self.fan, author=author).delete()
+        self.assertTrue(Job.objects.filter(
+            name='posts.tasks.prune_timeline').exists())
+        jobs.work('test')
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.fan).exists())
+
+    def test_author_crossing_limit_is_merged_at_once(self):
+        # Перешедший порог автор сразу подмешивается в ленты подписчиков
+        author = User.objects.create_user(username='rising')
+        Follow.objects.create(user=self.fan, author=author)
+        fan = Client()
+        fan.force_login(self.fan)
+        url = reverse('posts:follow_index')
+        fan.get(url)
+        Follow.objects.create(user=self.reader, author=author)
+        post = Post.objects.create(author=author, text='Уже звезда')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, fan.get(url).context['page_obj'])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_crossing_is_seen_when_jobs_lag(self):
+        # Задачи запускаются, когда счётчик уже ушёл за порог дальше
+        extra = User.objects.create_user(username='extra')
+        Follow.objects.create(user=extra, author=self.star)
+        post = Post.objects.create(author=self.star, text='Звезда')
+        jobs.work('test')
+        Follow.objects.filter(user=extra, author=self.star).delete()
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        jobs.work('test')
+        jobs.work('test')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+        author = User.objects.create_user(username='rising')
+        Follow.objects.create(user=self.fan, author=author)
+        jobs.work('test')
+        fan = Client()
+        fan.force_login(self.fan)
+        url = reverse('posts:follow_index')
+        fan.get(url)
+        Follow.objects.create(user=self.reader, author=author)
+        Follow.objects.create(user=extra, author=author)
+        jobs.work('test')
+        post = Post.objects.create(author=author, text='Уже звезда')
+        jobs.work('test')
+        self.assertIn(post, fan.get(url).context['page_obj'])
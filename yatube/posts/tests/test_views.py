@@ -9,7 +9,8 @@ from django.urls import reverse
 from django import forms
 from django.core.cache import cache
 
-from posts.models import Post, Group, Follow
+from posts import cards, comments
+from posts.models import Comment, Post, Group, Follow, TimelineEntry
 
 
 User = get_user_model()
@@ -193,14 +194,76 @@ class PostPagesTests(TestCase):
             group=self.group)
         response = self.authorized_client.get(
             reverse('posts:index')).content
-        post_c.delete()
+        # Изменение мимо сигналов не сбрасывает закэшированную ленту
+        Post.objects.filter(pk=post_c.pk).update(text='Тихая правка')
         response01 = self.authorized_client.get(
             reverse('posts:index')).content
         self.assertEqual(response, response01)
-        cache.clear()
-        content_before_delete = self.authorized_client.get(
+        # Удаление поста сдвигает поколение, и лента строится заново
+        post_c.delete()
+        content_after_delete = self.authorized_client.get(
             reverse('posts:index')).content
-        self.assertNotEqual(response01, content_before_delete)
+        self.assertNotEqual(response01, content_after_delete)
+        self.assertNotIn('Проверка кэша'.encode(), content_after_delete)
+
+    def test_cache_group_follows_group_edits(self):
+        # Правка группы сбрасывает закэшированные ленты с её ссылками
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        self.group.slug = 'new-slug'
+        self.group.save()
+        response = self.authorized_client.get(url)
+        self.assertIn(b'/group/new-slug/', response.content)
+        self.group.slug = 'test-slug'
+        self.group.save()
+
+    def test_caches_follow_author_rename(self):
+        # Имя и ссылка на профиль есть в карточках, лентах и комментариях
+        Comment.objects.create(
+            post=self.post, author=self.author_user, text='Ответ автора')
+        Follow.objects.create(
+            user=self.authorized_user, author=self.author_user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        # Гостю — и страницы из кэша анонимов.
+        pages = [(self.guest_client, url) for url in urls] + [
+            (self.authorized_client, url)
+            for url in urls + [reverse('posts:follow_index')]
+        ]
+        for client, url in pages:
+            client.get(url)
+        self.author_user.username = 'renamed'
+        self.author_user.first_name = 'Новое'
+        self.author_user.save()
+        try:
+            for client, url in pages:
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertContains(response, '/profile/renamed/')
+                    self.assertNotContains(response, '/profile/author_user/')
+            self.assertContains(
+                self.guest_client.get(urls[0]), 'Автор: Новое')
+            self.assertEqual(self.guest_client.get(
+                reverse('posts:profile', args=['renamed'])).status_code, 200)
+        finally:
+            self.author_user.username = 'author_user'
+            self.author_user.first_name = ''
+            self.author_user.save()
+
+    def test_post_card_cache_follows_post_edit(self):
+        # Карточка кэшируется по посту и сбрасывается правкой
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        self.assertIsNotNone(cache.get(cards._key(self.post.id)))
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Правленый текст', 'group': self.group.id})
+        self.assertIsNone(cache.get(cards._key(self.post.id)))
+        response = self.authorized_client.get(url)
+        self.assertIn('Правленый текст'.encode(), response.content)
 
 
 class PaginatorViewsTest(TestCase):
@@ -246,6 +309,74 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response1.context['page_obj']), reverse_name)
 
+    def test_cursor_paginator(self):
+        # Курсоры ведут вперёд и назад без пропусков и повторов
+        url = reverse('posts:index')
+        first = self.post_user.get(url).context['page_obj']
+        next_cursor = first.paginator.next_cursor
+        self.assertIsNotNone(next_cursor)
+        self.assertFalse(first.has_previous())
+        second = self.post_user.get(
+            url, {'cursor': next_cursor}).context['page_obj']
+        self.assertEqual(len(second), NUMBER_OF_POST_TEST)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            {post.id for post in first} & {post.id for post in second},
+            set())
+        back = self.post_user.get(
+            url, {'cursor': second.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_cursor_paginator_bad_token(self):
+        # Битый курсор открывает самую новую страницу
+        response = self.post_user.get(
+            reverse('posts:index'), {'cursor': 'мусор'})
+        self.assertEqual(
+            len(response.context['page_obj']), FIRST_PAGE_POST)
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Ответ {number}')
+            for number in range(comments.COMMENTS_PER_PAGE + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comments_load_page_by_page(self):
+        # Первая страница — самые новые, остальные по курсору
+        newest = list(self.post.comments.order_by('-created', '-id'))
+        first = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )).context['comment_page']
+        self.assertIn(newest[0].text, first['html'])
+        self.assertNotIn(newest[-1].text, first['html'])
+        rest = self.client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            {'cursor': first['next']},
+        ).json()
+        self.assertIsNone(rest['next'])
+        self.assertEqual(rest['html'].count('media-body'), 5)
+        self.assertIn(newest[-1].text, rest['html'])
+
+    def test_new_comment_resets_first_page(self):
+        url = reverse('posts:comments', kwargs={'post_id': self.post.id})
+        self.client.get(url)
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Свежий ответ'},
+        )
+        self.assertIn('Свежий ответ', self.client.get(url).json()['html'])
+
 
 class FollowerClientTest(TestCase):
     @classmethod
@@ -309,3 +440,23 @@ class FollowerClientTest(TestCase):
             reverse('posts:follow_index'))
         new_post = response_unfollower.context['page_obj']
         self.assertNotIn(new_post_unfollower, new_post)
+
+    def test_timeline_fan_out_and_prune(self):
+        # Новый пост попадает в ленту подписчика и уходит после отписки
+        Follow.objects.create(
+            author=self.author_user,
+            user=self.authorized_user
+        )
+        post = Post.objects.create(
+            author=self.author_user,
+            text='Пост для ленты'
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.authorized_user, post=post).exists())
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={
+                    'username': self.author_user}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.authorized_user).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertNotIn(post, response.context['page_obj'])
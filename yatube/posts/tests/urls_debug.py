@@ -0,0 +1,11 @@
+"""Адреса проекта с debug toolbar: тесты идут с DEBUG=False, и
+yatube/urls.py подключает его без адресов панели."""
+import debug_toolbar
+from django.urls import include, path
+
+from yatube.urls import urlpatterns as project_urlpatterns
+
+urlpatterns = [
+    path('__debug__/', include(debug_toolbar.urls)),
+    *project_urlpatterns,
+]
@@ -0,0 +1,34 @@
+import json
+import logging
+
+from sorl.thumbnail import get_thumbnail
+
+from posts import cards
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+FEED_SIZE = '960x339'
+SIZES = ('480x170', FEED_SIZE, '1920x678')
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def generate(post):
+    """Нарезает картинку поста во всех размерах и запоминает адреса.
+
+    Ленты берут готовые адреса из строки поста и не ходят ни в Pillow,
+    ни в хранилище ключей sorl.
+    """
+    urls = {}
+    if post.image:
+        for size in SIZES:
+            try:
+                thumbnail = get_thumbnail(post.image, size, **OPTIONS)
+            except (OSError, ValueError):
+                logger.exception('Не удалось нарезать %s', post.image)
+                continue
+            if thumbnail.exists():
+                urls[size] = thumbnail.url
+    post.thumbnails = json.dumps(urls) if urls else ''
+    Post.objects.filter(pk=post.pk).update(thumbnails=post.thumbnails)
+    cards.invalidate(post.pk)
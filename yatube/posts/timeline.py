@@ -0,0 +1,243 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core.object_cache import shared_timeout
+from posts import feed_cache
+from posts.models import Follow, Post, TimelineEntry, UserStats
+from posts.paginator import (KeySource, MergedSource, QuerySetSource,
+                             UnionKeySource, UnionSource)
+
+BATCH_SIZE = 500
+CELEBRITIES_TIMEOUT = 60
+
+
+def _store(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def _celebrities_key(user_id):
+    return f'timeline:celebrities:{user_id}'
+
+
+def follower_count(author_id):
+    count = UserStats.objects.filter(
+        user_id=author_id
+    ).values_list('followers_count', flat=True).first()
+    if count is None:
+        count = Follow.objects.filter(author_id=author_id).count()
+    return count
+
+
+def is_celebrity(author_id):
+    """Посты такого автора подмешиваются при чтении, а не при записи."""
+    return follower_count(author_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def followed_celebrities(user_id):
+    """Авторы из подписок пользователя, которых нет в его готовой ленте."""
+    key = _celebrities_key(user_id)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        # Пара (user, author) уникальна, так что DISTINCT не нужен.
+        author_ids = list(UserStats.objects.filter(
+            user__following__user_id=user_id,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True))
+        cache.set(key, author_ids, shared_timeout(CELEBRITIES_TIMEOUT))
+    return author_ids
+
+
+def retract(post_id):
+    """Убирает пост из всех готовых лент."""
+    TimelineEntry.objects.filter(post_id=post_id).delete()
+
+
+def fanout_followers(author_id):
+    """Подписчики, в чьи ленты раскладываются посты автора."""
+    if is_celebrity(author_id):
+        return []
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+
+
+def fan_out(post, followers):
+    """Кладёт новый пост в ленты подписчиков автора."""
+    _store(
+        TimelineEntry(user_id=user_id, post_id=post.id,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers
+    )
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку постов (id, author_id, pub_date) разом.
+
+    Подписчики каждого автора читаются один раз. Возвращает id
+    пользователей, чьи ленты изменились.
+    """
+    followers, touched, entries = {}, set(), []
+    for post_id, author_id, pub_date in posts:
+        if author_id not in followers:
+            followers[author_id] = fanout_followers(author_id)
+        for user_id in followers[author_id]:
+            entries.append(TimelineEntry(
+                user_id=user_id, post_id=post_id,
+                author_id=author_id, pub_date=pub_date))
+        touched.update(followers[author_id])
+        if len(entries) >= BATCH_SIZE:
+            _store(entries)
+            entries = []
+    _store(entries)
+    return touched
+
+
+def _insert_select(where, params):
+    """Кладёт в ленты подписчиков посты, подходящие под where.
+
+    Строки лент не проходят через Python. Посты «звёзд» пропускаются,
+    как в fanout_followers. Возвращает число добавленных записей.
+    """
+    ops = connection.ops
+    entry, post, follow, stats = (
+        ops.quote_name(model._meta.db_table)
+        for model in (TimelineEntry, Post, Follow, UserStats))
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} {entry} '
+        '(user_id, post_id, author_id, pub_date) '
+        'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+        f'FROM {post} p JOIN {follow} f ON f.author_id = p.author_id '
+        f'WHERE {where} AND p.author_id NOT IN ('
+        f'SELECT user_id FROM {stats} WHERE followers_count > %s) '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, settings.TIMELINE_FANOUT_LIMIT])
+        return cursor.rowcount
+
+
+def fan_out_since(post_id):
+    """Раскладывает все посты с id больше post_id одним INSERT … SELECT.
+
+    Для массовой загрузки: счётчики подписчиков к этому моменту должны
+    быть пересчитаны. Возвращает число добавленных записей.
+    """
+    return _insert_select('p.id > %s', [post_id])
+
+
+def forget(user_id):
+    """Сбрасывает кэш «звёзд» и версию ленты подписок пользователя."""
+    cache.delete(_celebrities_key(user_id))
+    feed_cache.bump(f'follow:{user_id}')
+
+
+def forget_followers(author_id):
+    """Сбрасывает кэш «звёзд» и версии лент всех подписчиков автора."""
+    followers = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+    cache.delete_many([_celebrities_key(user_id) for user_id in followers])
+    feed_cache.bump(*[f'follow:{user_id}' for user_id in followers])
+
+
+def backfill_followers(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков.
+
+    Нужна, когда автор опустился до порога: его посты, вышедшие без
+    раскладки, теперь должны лежать в готовых лентах.
+    """
+    _insert_select('p.author_id = %s', [author_id])
+    forget_followers(author_id)
+
+
+def backfill(user_id, author_id, count=None):
+    """Добавляет в ленту подписчика уже опубликованные посты автора.
+
+    count — число подписчиков автора сразу после этой подписки: сигнал
+    читает его в той же транзакции, что и сдвиг счётчика. К запуску
+    задачи счётчик мог уйти дальше, и переход порога был бы пропущен.
+
+    Если этой подпиской автор перешёл порог раскладки, его новые посты
+    будут подмешиваться при чтении: у всех подписчиков сбрасываются
+    кэш «звёзд» и версии лент, иначе до истечения CELEBRITIES_TIMEOUT
+    этих постов у них не будет.
+    """
+    if count is None:
+        count = follower_count(author_id)
+    if count == settings.TIMELINE_FANOUT_LIMIT + 1:
+        forget_followers(author_id)
+    if count <= settings.TIMELINE_FANOUT_LIMIT:
+        posts = Post.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'pub_date')
+        _store(
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+    # Сброс после записи: фрагмент, собранный до неё, не переживёт его.
+    forget(user_id)
+
+
+def prune(user_id, author_id, count=None):
+    """Убирает посты автора из ленты, если подписки на него больше нет.
+
+    count — число подписчиков сразу после отписки, как в backfill().
+    Возвращает True, если этой отпиской автор опустился до порога
+    раскладки: тогда его посты нужно разложить по лентам всех
+    подписчиков задачей backfill_followers.
+    """
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        forget(user_id)
+        return False
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+    forget(user_id)
+    if count is None:
+        count = follower_count(author_id)
+    return count == settings.TIMELINE_FANOUT_LIMIT
+
+
+class TimelineSource(QuerySetSource):
+    """Лента подписок одного пользователя: один проход по индексу."""
+
+    def __init__(self, user):
+        super().__init__(
+            TimelineEntry.objects.filter(user=user).select_related(
+                'post__author', 'post__group'),
+            fields=('pub_date', 'post_id'),
+        )
+
+    def item(self, entry):
+        return entry.post
+
+
+def _celebrity_posts(celebrities):
+    return [Post.objects.filter(author_id=author_id)
+            for author_id in celebrities]
+
+
+def feed_source(user):
+    """Лента подписок: готовые записи плюс свежие посты «звёзд»."""
+    source = TimelineSource(user)
+    celebrities = followed_celebrities(user.id)
+    if not celebrities:
+        return source
+    # Посты всех «звёзд» — один запрос, и каждый автор в нём читается
+    # по индексу (author, pub_date).
+    return MergedSource([source, UnionSource(
+        Post.objects.select_related('author', 'group'),
+        _celebrity_posts(celebrities))])
+
+
+def feed_key_source(user):
+    """Та же лента подписок, но только ключи (pub_date, id поста)."""
+    source = KeySource(
+        TimelineEntry.objects.filter(user=user), ('pub_date', 'post_id'))
+    celebrities = followed_celebrities(user.id)
+    if not celebrities:
+        return source
+    return MergedSource([source, UnionKeySource(
+        Post.objects.all(), _celebrity_posts(celebrities))])
@@ -1,67 +1,111 @@
+import hashlib
+
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import redirect
-from posts.models import Post, Group, User, Follow
+from posts.models import Post, Follow
 from posts.forms import CommentForm, PostForm
+from core import jobs
+from core.object_cache import shared_timeout
+from core.page_cache import cache_anonymous
+from posts import comments, counters, feed_cache, lookups, search, tasks
+from posts.conditional import (comments_scopes, feed_condition,
+                               group_scopes, index_scopes, page_version,
+                               post_scopes, profile_scopes, search_scopes)
+from posts.paginator import RankedSource, paginate
+from posts.timeline import feed_source, followed_celebrities
 
 POST_PER_PAGE = 10
+SEARCH_TIMEOUT = 60 * 5
 
 
+@feed_condition(index_scopes)
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    paginator = Paginator(post_list, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, post_list, POST_PER_PAGE)
     context = {
         'page_obj': page_obj,
-        'paginator': paginator,
+        'paginator': page_obj.paginator,
+        'feed_timeout': shared_timeout(feed_cache.FRAGMENT_TIMEOUT),
+        'feed_version': feed_cache.versions('posts', 'groups'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@feed_condition(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = lookups.groups.get_or_404(slug)
     posts = group.posts.select_related(
         'author'
     )
-
-    paginator = Paginator(posts, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, POST_PER_PAGE)
     context = {
         'group': group,
         'page_obj': page_obj,
-        'paginator': paginator,
+        'paginator': page_obj.paginator,
+        'feed_timeout': shared_timeout(feed_cache.FRAGMENT_TIMEOUT),
+        'feed_version': feed_cache.versions(f'group:{group.id}', 'groups'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@feed_condition(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.users.get_or_404(username)
     user_posts = author.posts.select_related('group')
-    paginator = Paginator(user_posts, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, user_posts, POST_PER_PAGE)
     following = request.user.is_authenticated and author.following.filter(
         user=request.user).exists()
     context = {
         'author': author,
         'page_obj': page_obj,
-        'paginator': paginator,
+        'paginator': page_obj.paginator,
         'following': following,
+        'stats': counters.user_stats(author),
+        'feed_timeout': shared_timeout(feed_cache.FRAGMENT_TIMEOUT),
+        'feed_version': feed_cache.versions(f'author:{author.id}', 'groups'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous(page_version(search_scopes))
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    # Выдача живёт до первого изменения постов или SEARCH_TIMEOUT;
+    # частый запрос пересобирает один поток, остальные ждут его.
+    key = 'search:{}:{}'.format(
+        feed_cache.versions('posts'),
+        hashlib.md5(query.encode()).hexdigest(),
+    )
+    post_ids = caches['tiered'].get_or_set(
+        key, lambda: search.search(query),
+        shared_timeout(SEARCH_TIMEOUT))
+    posts = Post.objects.select_related('author', 'group')
+    page_obj = paginate(
+        request, posts.filter(id__in=post_ids), POST_PER_PAGE,
+        source=RankedSource(posts, post_ids))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@feed_condition(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comments,
-        'form': form
+        'comment_page': comments.comment_page(post.id),
+        'form': form,
+        'author_stats': counters.user_stats(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -76,13 +120,15 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    if post.image:
+        jobs.enqueue(tasks.generate_thumbnails, post.id)
     return redirect('posts:profile', request.user)
 
 
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:post_detail', post_id=post.id)
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
@@ -93,10 +139,25 @@ def post_edit(request, post_id):
     }
     if request.method != 'POST' or not form.is_valid():
         return render(request, 'posts/post_create.html', context)
-    form.save()
+    post = form.save(commit=False)
+    if 'image' in form.changed_data:
+        # Нарезки старой картинки сбрасываются тем же сохранением: пока
+        # задача не нарезала новые, карточка показывает post.image.
+        post.thumbnails = ''
+    post.save()
+    if 'image' in form.changed_data and post.image:
+        jobs.enqueue(tasks.generate_thumbnails, post.id)
     return redirect('posts:post_detail', post_id=post.id)
 
 
+@cache_anonymous(page_version(comments_scopes))
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки со страницы поста."""
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    return JsonResponse(
+        comments.comment_page(post_id, request.GET.get('cursor')))
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -111,19 +172,24 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post, POST_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post = Post.objects.filter(
+        author__following__user=request.user
+    ).select_related('author', 'group')
+    page_obj = paginate(request, post, POST_PER_PAGE,
+                        source=feed_source(request.user))
+    celebrities = followed_celebrities(request.user.id)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_timeout': shared_timeout(feed_cache.FRAGMENT_TIMEOUT),
+        'feed_version': feed_cache.versions(
+            *feed_cache.follow_scopes(request.user.id, celebrities)),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.users.get_or_404(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
@@ -131,6 +197,6 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.users.get_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect("posts:profile", username=username)
@@ -12,6 +12,7 @@ from django.contrib.auth.views import (
 
 from django.urls import path
 from users import views
+from users.forms import QueuedPasswordResetForm
 
 
 app_name = 'users'
@@ -47,7 +48,8 @@ urlpatterns = [
     path(
         'password_reset/',
         PasswordResetView.as_view(
-            template_name='users/password_reset_form.html'
+            template_name='users/password_reset_form.html',
+            form_class=QueuedPasswordResetForm,
         ),
         name='password_reset'
     ),
@@ -26,18 +26,22 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.perf.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiler.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.page_cache.AnonymousPageCacheMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
@@ -121,9 +125,76 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Фрагменты лент и результаты поиска: LRU процесса перед 'default'
+    # и защита от одновременной пересборки одного ключа.
+    'tiered': {
+        'BACKEND': 'core.tiered_cache.TieredCache',
+        'OPTIONS': {'L2': 'default'},
+    },
 }
 
+# Файл общего для всех воркеров кэша (core.sqlite_cache). Без него каждый
+# процесс держит свой LocMemCache и не видит сбросов из соседних.
+if os.environ.get('YATUBE_CACHE_FILE'):
+    CACHES['default'] = {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_CACHE_FILE'],
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Авторы, у которых подписчиков больше, не раскладываются по лентам
+# при публикации: их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Фоновая очередь задач (core.jobs). В режиме TASKS_ALWAYS_EAGER задачи
+# выполняются сразу в процессе запроса — так работают разработка и тесты;
+# в бою режим выключается и запускается `manage.py run_worker`.
+TASKS_ALWAYS_EAGER = DEBUG
+TASKS_VISIBILITY_TIMEOUT = 300
+TASKS_MAX_ATTEMPTS = 5
+
+# Поиск по постам (posts.search): 'fts' — таблица SQLite FTS5,
+# 'inverted' — обратный индекс в обычной таблице. None выбирает FTS5,
+# если SQLite собран с ним.
+SEARCH_BACKEND = None
+
+# Замеры запросов (core.perf): доля запросов в выборке, заголовок
+# Server-Timing и размер кольцевого буфера последних записей. JSON
+# каждой записи пишется в логгер 'yatube.perf' на уровне INFO.
+# Запрос в выборке дольше на 0,1–0,2 мс (manage.py benchmark_perf на
+# 10 000 постов): +2–4 % к отрисованной странице и +5–12 % к ответу из
+# кэша страниц. При доле 0,1 в среднем выходит не больше 1 %.
+PERF_SAMPLE_RATE = float(os.environ.get('YATUBE_PERF_SAMPLE_RATE', 0.1))
+PERF_SERVER_TIMING = True
+PERF_BUFFER_SIZE = 1000
+
+# Запросы к базе дольше стольких миллисекунд попадают в журнал
+# core.slow_queries вместе с планом; None выключает журнал.
+SLOW_QUERY_MS = 100
+
+# Профилировщик (core.profiler) для персонала: ?profile у любого адреса
+# и /debug/profile/?seconds=N. Выключен, пока не включён явно.
+PROFILER_ENABLED = bool(os.environ.get('YATUBE_PROFILER'))
+PROFILER_PARAM = 'profile'
+PROFILER_INTERVAL = 0.01
+PROFILER_MAX_SECONDS = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.perf': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_PERF_LOG', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -9,6 +9,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('debug/', include('core.urls', namespace='core')),
 ]
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.permission_denied'